@@ -7,7 +7,7 @@ Base class for all AI agents.
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 from core.llm import get_llm, GeminiLLM
 from core.rag import get_rag_system, RAGSystem
@@ -97,10 +97,14 @@ class BaseAgent(ABC):
             action: Action description
             details: Additional details
         """
+        # Skip the dict/timestamp allocation entirely when INFO is off
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         log_entry = {
             "agent": self.name,
             "action": action,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "details": details or {}
         }
         self.logger.info(f"{action}", extra=log_entry)
@@ -5,15 +5,202 @@ Extracts and organizes key concepts from course materials.
 """
 
 from typing import Dict, List, Any, Optional
+from collections import defaultdict, deque
+from dataclasses import dataclass, fields
+import asyncio
+import hashlib
 import logging
-import json
 import re
+import time
+import unicodedata
+
+import numpy as np
+import orjson
 
 from agents.base_agent import BaseAgent
+from core.embeddings import get_embedding_service
+from core.llm_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# Fallback-extraction constants, built once at import time so the per-chunk
+# hot path only scans data instead of rebuilding sets and recompiling regexes.
+# ---------------------------------------------------------------------------
+
+# Common person name patterns to filter - first/last names
+_COMMON_FIRST_NAMES = frozenset({
+    'muhammad', 'mohammad', 'ahmed', 'ali', 'john', 'james', 'michael', 'david',
+    'robert', 'william', 'dr', 'prof', 'professor', 'mr', 'mrs', 'ms', 'sir'
+})
+_COMMON_LAST_NAMES = frozenset({
+    'khan', 'ahmed', 'ali', 'smith', 'johnson', 'williams', 'brown', 'jones',
+    'idrees', 'owais', 'shah', 'malik', 'hussain', 'kumar', 'singh'
+})
+
+# Stop phrases - metadata and non-concept content
+_STOP_PHRASES = frozenset({
+    "Table Of Contents", "Figure Shows", "Chapter Summary", "Cross Reference",
+    "Section Introduction", "Page Number", "End Of Chapter", "Learning Objectives",
+    "Course Instructor", "Course Name", "Semester Fall", "Semester Spring",
+    "Department Of", "University Of", "Assignment Due", "Quiz Date",
+    "Lecture Notes", "Slide Number", "Copyright Reserved", "All Rights",
+    "Contact Information", "Email Address", "Office Hours", "Course Outline"
+})
+
+# Specific garbage names the user reported
+_BLOCKED_PATTERNS = (
+    "muhammadowaisidrees", "owaisidrees", "muhammad", "idrees",
+    "instructor", "student", "teacher", "professor"
+)
+
+# Contains specific garbage keywords
+_GARBAGE_KEYWORDS = (
+    'slide', 'title slide', 'business model', 'how it works',
+    'what we', 'we built', 'our team', 'our mission', 'our vision',
+    'agenda', 'outline', 'overview', 'introduction', 'conclusion',
+    'thank you', 'questions', 'q&a', 'contact us', 'next steps',
+    'table of contents', 'copyright', 'all rights reserved',
+    'proprietary', 'confidential', 'draft', 'version'
+)
+
+# SLIDE titles and presentation artifacts (e.g., "SLIDE 7: HOW IT WORKS"),
+# fused into a single alternation so one match covers all patterns
+_SLIDE_RE = re.compile("|".join(f"(?:{p})" for p in (
+    r'^slide\s*\d+',   # SLIDE 7, Slide 12
+    r'^page\s*\d+',    # Page 1, PAGE 5
+    r'^section\s*\d+',  # Section 1
+    r'^chapter\s*\d+',  # Chapter 3
+    r'^\d+\s*[-:]\s*',  # 7: TITLE, 12 - SOMETHING
+    r'^\d+%',           # 35% Complete
+    r'\d+%\s*(?:complete|done|finished)',  # XX% Complete
+    r'^appendix',       # Appendix A
+    r'^exhibit',        # Exhibit 1
+)))
+
+# Presentation section patterns
+_SECTION_PREFIX_RE = re.compile(
+    r'^(the\s+)?(perfect|financial|market|problem|solution|team|product)'
+)
+
+# Substring keyword checks collapsed into single compiled alternations so
+# each phrase is scanned once in C instead of once per keyword in Python
+_BLOCKED_RE = re.compile("|".join(map(re.escape, _BLOCKED_PATTERNS)))
+_GARBAGE_RE = re.compile("|".join(map(re.escape, _GARBAGE_KEYWORDS)))
+_NAME_WORDS = _COMMON_FIRST_NAMES | _COMMON_LAST_NAMES
+
+# Multi-word capitalized phrases (likely concepts), compiled once at import
+_CAPS_RE = re.compile(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\b')
+
+# Lowercased stop phrases, precomputed so the scan loops don't re-lower
+# the same constants for every line/phrase
+_STOP_PHRASES_LOWER = tuple(s.lower() for s in _STOP_PHRASES)
+
+
+@dataclass(slots=True)
+class Concept:
+    """
+    Typed view of a concept dict for graph generation.
+
+    Slots keep instances compact and make field access an index load
+    instead of a chain of dict.get calls with defaults.
+    """
+    name: str = ""
+    importance: int = 5
+    difficulty: str = "medium"
+    category: str = "General"
+    prerequisites: str = ""
+    related_concepts: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Concept":
+        """Build a Concept from an LLM/DB concept dict, ignoring extras."""
+        return cls(**{
+            f: data[f] for f in _CONCEPT_FIELDS
+            if data.get(f) is not None
+        })
+
+
+_CONCEPT_FIELDS = tuple(f.name for f in fields(Concept))
+
+
+# Relationship prompt template, allocated once at import time
+_RELATIONSHIP_PROMPT_TPL = """Analyze these concepts and identify relationships between them.
+
+CONCEPTS:
+{names}
+
+For each pair of related concepts, output the relationship type:
+- "prerequisite": concept A must be learned before concept B
+- "related": concepts are related but neither is prerequisite
+- "part_of": concept A is a subtopic of concept B
+
+Return as JSON array:
+[
+  {{"from": "Concept A", "to": "Concept B", "type": "prerequisite"}},
+  ...
+]
+
+Return ONLY the JSON array of relationships:"""
+
+
+def _canonical_name(name: str) -> str:
+    """
+    Normalize a concept name to its dedup key.
+
+    Unicode-normalized + casefolded so "Naïve Bayes" and "naive bayes"
+    collapse to the same key. The key is computed once per concept and
+    shared by every dedup pass.
+    """
+    return unicodedata.normalize("NFKD", name).casefold().strip()
+
+
+def _is_garbage_or_name(phrase: str) -> bool:
+    """Check if phrase is a name, garbage, or metadata."""
+    # 1. Cheap structural checks first — no lowering or scanning needed:
+    #    numbered concepts ("1 Feature..."), figures/tables, and long
+    #    concatenated strings without spaces (parsing errors, e.g.
+    #    "UnderstandingLogisticRegressionOctober1,2025")
+    if phrase and phrase[0].isdigit():
+        return True
+    if len(phrase) > 20 and ' ' not in phrase:
+        return True
+
+    phrase_lower = phrase.lower().strip()
+    words = phrase_lower.split()
+
+    # 2. Filter very long phrases (likely sentences, not concepts)
+    if len(words) > 5:
+        return True
+
+    if phrase_lower.startswith("figure") or phrase_lower.startswith("table"):
+        return True
+
+    # 3. Specific garbage names the user reported
+    if _BLOCKED_RE.search(phrase_lower.replace(" ", "")):
+        return True
+
+    # 4. Slide titles and presentation artifacts
+    if _SLIDE_RE.match(phrase_lower):
+        return True
+
+    # 5. Contains specific garbage keywords
+    if _GARBAGE_RE.search(phrase_lower):
+        return True
+
+    # 6. Presentation section patterns
+    if len(words) <= 3 and _SECTION_PREFIX_RE.match(phrase_lower):
+        # These are often slide section names, not concepts
+        return True
+
+    # 7. Check for common names
+    if any(w in _NAME_WORDS for w in words):
+        return True
+
+    return False
+
+
 class ConceptExtractorAgent(BaseAgent):
     """
     Agent for extracting key concepts from course materials.
@@ -25,23 +212,57 @@ class ConceptExtractorAgent(BaseAgent):
     - Builds concept hierarchies
     """
     
+    # Bounded concurrency + token bucket keeps us under Gemini Free Tier limits (15 RPM)
+    MAX_CONCURRENT_CHUNKS = 5
+    REQUESTS_PER_MINUTE = 14
+
+    # Relationship prompts are sharded into overlapping windows so pairs
+    # spanning a window boundary are still seen together
+    RELATIONSHIP_WINDOW = 30
+    RELATIONSHIP_WINDOW_STEP = 20
+
     def __init__(self):
         super().__init__("ConceptExtractorAgent")
-    
+        self._chunk_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CHUNKS)
+        self._rate_lock = asyncio.Lock()
+        self._request_times: deque = deque()
+        self._cache = get_semantic_cache("concept_extractor")
+
+    async def _acquire_rate_slot(self) -> None:
+        """
+        Token-bucket rate limiter sized to the provider's RPM.
+
+        Blocks until a request slot is available in the sliding
+        60-second window.
+        """
+        while True:
+            async with self._rate_lock:
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= 60:
+                    self._request_times.popleft()
+                if len(self._request_times) < self.REQUESTS_PER_MINUTE:
+                    self._request_times.append(now)
+                    return
+                wait_time = 60 - (now - self._request_times[0])
+            await asyncio.sleep(wait_time)
+
     async def run(
         self,
         text: str,
         course_name: str = None,
-        max_concepts: int = 50
+        max_concepts: int = 50,
+        skip_relationships: bool = False
     ) -> List[Dict[str, Any]]:
         """
         Extract concepts from text.
-        
+
         Args:
             text: Source text to analyze
             course_name: Name of the course for context
             max_concepts: Maximum number of concepts to extract
-        
+            skip_relationships: Skip per-call relationship extraction
+                (used when the caller batches relationships itself)
+
         Returns:
             List of concept dictionaries
         """
@@ -50,14 +271,20 @@ class ConceptExtractorAgent(BaseAgent):
             "max_concepts": max_concepts
         })
         
-        concepts = await self.llm.extract_concepts(text, max_concepts)
-        
+        # Semantic cache: re-ingested or near-duplicate text skips the LLM
+        concepts = await self._cache.get(text)
+
+        if concepts is None:
+            concepts = await self.llm.extract_concepts(text, max_concepts)
+            if concepts:
+                await self._cache.put(text, concepts)
+
         if not concepts:
             # Fallback: basic extraction
             concepts = self._basic_extraction(text, max_concepts)
         
         # Identify relationships between concepts
-        if len(concepts) > 1:
+        if not skip_relationships and len(concepts) > 1:
             concepts = await self._identify_relationships(concepts)
         
         self._log_action("Concepts extracted", {"count": len(concepts)})
@@ -79,28 +306,134 @@ class ConceptExtractorAgent(BaseAgent):
         Returns:
             Deduplicated list of concepts
         """
+        # Pre-filter so empty/tiny chunks never consume a rate-limit slot
+        candidates = [c for c in chunks if len(c.get("text", "")) >= 100]
+
+        # Request-scoped memo: identical chunk texts (repeated headers,
+        # table-of-contents pages) are extracted once. Re-attributing the
+        # duplicate's concepts would be a no-op anyway since the name
+        # dedup below drops them.
+        unique_by_digest: Dict[bytes, Dict[str, Any]] = {}
+        for chunk in candidates:
+            digest = hashlib.blake2b(
+                chunk.get("text", "").encode(), digest_size=16
+            ).digest()
+            unique_by_digest.setdefault(digest, chunk)
+
+        if len(unique_by_digest) < len(candidates):
+            logger.info(
+                f"Skipping {len(candidates) - len(unique_by_digest)} duplicate chunks"
+            )
+
+        async def _extract_one(chunk: Dict[str, Any]):
+            async with self._chunk_semaphore:
+                await self._acquire_rate_slot()
+                # Relationships are batched once over the deduped set below,
+                # not per chunk
+                concepts = await self.run(
+                    chunk.get("text", ""), course_name, max_concepts=20,
+                    skip_relationships=True
+                )
+                return chunk, concepts
+
+        results = await asyncio.gather(
+            *(_extract_one(c) for c in unique_by_digest.values()),
+            return_exceptions=True
+        )
+
+        # Deduplicate serially over the gathered results
         all_concepts = []
         seen_names = set()
-        
-        import asyncio
-        for chunk in chunks:
-            text = chunk.get("text", "")
-            if not text or len(text) < 100:
+
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Chunk extraction failed: {result}")
                 continue
-            
-            # THROTTLE: 4s delay avoids hitting Gemini Free Tier Rate Limits (15 RPM)
-            await asyncio.sleep(4)
-            
-            concepts = await self.run(text, course_name, max_concepts=20)
-            
+            chunk, concepts = result
             for concept in concepts:
-                name = concept.get("name", "").lower().strip()
+                name = _canonical_name(concept.get("name", ""))
                 if name and name not in seen_names:
                     seen_names.add(name)
                     concept["source_chunk_id"] = chunk.get("chunk_id")
                     all_concepts.append(concept)
-        
+
+        # Fold paraphrased near-duplicates that exact-key dedup misses,
+        # shrinking the relationship prompt below
+        all_concepts = await self._merge_near_duplicates(all_concepts)
+
+        # One batched relationship pass over the global deduped set instead
+        # of one LLM round-trip per chunk
+        if len(all_concepts) > 1:
+            all_concepts = await self._identify_relationships(all_concepts)
+
         return all_concepts
+
+    # Cosine similarity above which two concept names are considered the
+    # same concept ("Gradient Descent" vs "gradient-descent method")
+    NEAR_DUPLICATE_THRESHOLD = 0.9
+
+    async def _merge_near_duplicates(
+        self,
+        concepts: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge semantically near-duplicate concepts.
+
+        Embeds all concept names in a single batch and keeps the first
+        concept of each near-duplicate group, unioning relationship
+        strings from the dropped duplicates.
+
+        Args:
+            concepts: Exact-deduplicated concepts
+
+        Returns:
+            Concepts with near-duplicates merged
+        """
+        if len(concepts) < 2:
+            return concepts
+
+        embedder = get_embedding_service()
+        if embedder.model is None:
+            return concepts
+
+        try:
+            names = [c.get("name", "") for c in concepts]
+            embeddings = await embedder.embed_async(names)
+
+            # Embeddings are normalized: pairwise cosine in one matmul
+            sims = embeddings @ embeddings.T
+
+            merged: List[Dict[str, Any]] = []
+            kept_indices: List[int] = []
+
+            for i, concept in enumerate(concepts):
+                dup_of = next(
+                    (j for j in kept_indices
+                     if sims[i, j] >= self.NEAR_DUPLICATE_THRESHOLD),
+                    None
+                )
+                if dup_of is None:
+                    kept_indices.append(i)
+                    merged.append(concept)
+                else:
+                    target = concepts[dup_of]
+                    for field in ("prerequisites", "related_concepts"):
+                        union = {
+                            s.strip()
+                            for s in (target.get(field, "") + "," + concept.get(field, "")).split(",")
+                            if s.strip()
+                        }
+                        if union:
+                            target[field] = ",".join(union)
+
+            if len(merged) < len(concepts):
+                logger.info(
+                    f"Merged {len(concepts) - len(merged)} near-duplicate concepts"
+                )
+            return merged
+        except Exception as e:
+            logger.warning(f"Near-duplicate merge failed: {e}")
+            return concepts
     
     async def _identify_relationships(
         self,
@@ -117,61 +450,90 @@ class ConceptExtractorAgent(BaseAgent):
         """
         if len(concepts) < 2:
             return concepts
-        
-        # Create concept list for LLM
-        concept_names = [c.get("name", "") for c in concepts[:30]]
-        
-        prompt = f"""Analyze these concepts and identify relationships between them.
 
-CONCEPTS:
-{json.dumps(concept_names, indent=2)}
+        names = [c.get("name", "") for c in concepts]
 
-For each pair of related concepts, output the relationship type:
-- "prerequisite": concept A must be learned before concept B
-- "related": concepts are related but neither is prerequisite
-- "part_of": concept A is a subtopic of concept B
+        # Small sets fit one prompt; larger sets are sharded into
+        # overlapping windows queried in parallel, so concepts beyond the
+        # first 30 get relationships too instead of being silently dropped
+        if len(names) <= self.RELATIONSHIP_WINDOW:
+            windows = [names]
+        else:
+            windows = [
+                names[i:i + self.RELATIONSHIP_WINDOW]
+                for i in range(0, len(names), self.RELATIONSHIP_WINDOW_STEP)
+            ]
 
-Return as JSON array:
-[
-  {{"from": "Concept A", "to": "Concept B", "type": "prerequisite"}},
-  ...
-]
+        results = await asyncio.gather(
+            *(self._relationships_for_window(w) for w in windows),
+            return_exceptions=True
+        )
 
-Return ONLY the JSON array of relationships:"""
+        # Merge the per-window maps by union
+        relation_map = defaultdict(
+            lambda: {"prerequisites": set(), "related": set()}
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Relationship extraction failed: {result}")
+                continue
+            for name, buckets in result.items():
+                relation_map[name]["prerequisites"] |= buckets["prerequisites"]
+                relation_map[name]["related"] |= buckets["related"]
+
+        # Update concepts
+        for concept in concepts:
+            rm = relation_map.get(concept.get("name", "").lower())
+            if rm:
+                concept["prerequisites"] = ",".join(rm["prerequisites"])
+                concept["related_concepts"] = ",".join(rm["related"])
 
-        try:
-            response = await self.llm.generate(prompt, temperature=0.3)
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            
-            if json_match:
-                relationships = json.loads(json_match.group())
-                
-                # Add relationships to concepts
-                relation_map = {}
-                for rel in relationships:
-                    from_name = rel.get("from", "").lower()
-                    to_name = rel.get("to", "").lower()
-                    rel_type = rel.get("type", "related")
-                    
-                    if from_name not in relation_map:
-                        relation_map[from_name] = {"prerequisites": [], "related": []}
-                    
-                    if rel_type == "prerequisite":
-                        relation_map[from_name]["prerequisites"].append(to_name)
-                    else:
-                        relation_map[from_name]["related"].append(to_name)
-                
-                # Update concepts
-                for concept in concepts:
-                    name = concept.get("name", "").lower()
-                    if name in relation_map:
-                        concept["prerequisites"] = ",".join(relation_map[name].get("prerequisites", []))
-                        concept["related_concepts"] = ",".join(relation_map[name].get("related", []))
-                
-        except Exception as e:
-            logger.warning(f"Relationship extraction failed: {e}")
-        
         return concepts
+
+    async def _relationships_for_window(
+        self,
+        concept_names: List[str]
+    ) -> Dict[str, Dict[str, set]]:
+        """
+        Query relationships for one window of concept names.
+
+        Args:
+            concept_names: Concept names for this window
+
+        Returns:
+            Map of lowercased name -> prerequisite/related name sets
+        """
+        prompt = _RELATIONSHIP_PROMPT_TPL.format(
+            names=orjson.dumps(
+                concept_names, option=orjson.OPT_INDENT_2
+            ).decode()
+        )
+
+        response = await self._cache.get(prompt)
+        if response is None:
+            response = await self.llm.generate(prompt, temperature=0.3)
+            await self._cache.put(prompt, response)
+
+        # Sets drop duplicate edges that would otherwise inflate the
+        # knowledge graph
+        relation_map: Dict[str, Dict[str, set]] = defaultdict(
+            lambda: {"prerequisites": set(), "related": set()}
+        )
+
+        json_match = re.search(r'\[[\s\S]*\]', response)
+        if json_match:
+            relationships = orjson.loads(json_match.group())
+            for rel in relationships:
+                from_name = rel.get("from", "").lower()
+                to_name = rel.get("to", "").lower()
+                rel_type = rel.get("type", "related")
+
+                if rel_type == "prerequisite":
+                    relation_map[from_name]["prerequisites"].add(to_name)
+                else:
+                    relation_map[from_name]["related"].add(to_name)
+
+        return relation_map
     
     def _basic_extraction(
         self,
@@ -186,134 +548,59 @@ Return ONLY the JSON array of relationships:"""
         - Course metadata and headers
         - Non-educational content
         """
-        import re
-        from collections import Counter
-        
         concepts = []
-        
-        # Common person name patterns to filter - first/last names
-        common_first_names = {
-            'muhammad', 'mohammad', 'ahmed', 'ali', 'john', 'james', 'michael', 'david', 
-            'robert', 'william', 'dr', 'prof', 'professor', 'mr', 'mrs', 'ms', 'sir'
-        }
-        common_last_names = {
-            'khan', 'ahmed', 'ali', 'smith', 'johnson', 'williams', 'brown', 'jones',
-            'idrees', 'owais', 'shah', 'malik', 'hussain', 'kumar', 'singh'
-        }
-        
-        # Stop phrases - metadata and non-concept content
-        stop_phrases = {
-            "Table Of Contents", "Figure Shows", "Chapter Summary", "Cross Reference",
-            "Section Introduction", "Page Number", "End Of Chapter", "Learning Objectives",
-            "Course Instructor", "Course Name", "Semester Fall", "Semester Spring",
-            "Department Of", "University Of", "Assignment Due", "Quiz Date",
-            "Lecture Notes", "Slide Number", "Copyright Reserved", "All Rights",
-            "Contact Information", "Email Address", "Office Hours", "Course Outline"
-        }
-        
-        def is_garbage_or_name(phrase):
-            """Check if phrase is a name, garbage, or metadata."""
-            phrase_clean = phrase.lower().replace(" ", "")
-            phrase_lower = phrase.lower().strip()
-            
-            # 1. Specific garbage names the user reported
-            blocked_patterns = [
-                "muhammadowaisidrees", "owaisidrees", "muhammad", "idrees", 
-                "instructor", "student", "teacher", "professor"
-            ]
-            if any(bp in phrase_clean for bp in blocked_patterns):
-                return True
-            
-            # 2. SLIDE titles and presentation artifacts (e.g., "SLIDE 7: HOW IT WORKS")
-            slide_patterns = [
-                r'^slide\s*\d+',  # SLIDE 7, Slide 12
-                r'^page\s*\d+',   # Page 1, PAGE 5
-                r'^section\s*\d+', # Section 1
-                r'^chapter\s*\d+', # Chapter 3
-                r'^\d+\s*[-:]\s*', # 7: TITLE, 12 - SOMETHING
-                r'^\d+%',          # 35% Complete
-                r'\d+%\s*(complete|done|finished)', # XX% Complete
-                r'^appendix',      # Appendix A
-                r'^exhibit',       # Exhibit 1
-            ]
-            for pattern in slide_patterns:
-                if re.match(pattern, phrase_lower):
-                    return True
-            
-            # 3. Contains specific garbage keywords
-            garbage_keywords = [
-                'slide', 'title slide', 'business model', 'how it works', 
-                'what we', 'we built', 'our team', 'our mission', 'our vision',
-                'agenda', 'outline', 'overview', 'introduction', 'conclusion',
-                'thank you', 'questions', 'q&a', 'contact us', 'next steps',
-                'table of contents', 'copyright', 'all rights reserved',
-                'proprietary', 'confidential', 'draft', 'version'
-            ]
-            if any(keyword in phrase_lower for keyword in garbage_keywords):
-                return True
-                
-            # 4. Check for long concatenated strings without spaces (parsing errors)
-            # e.g., "UnderstandingLogisticRegressionOctober1,2025"
-            if len(phrase) > 20 and ' ' not in phrase:
-                return True
-                
-            # 5. Check for Numbered Concepts (e.g. "1 Feature...") or Figures/Tables
-            if phrase and phrase[0].isdigit():
-                return True
-            if phrase_lower.startswith("figure") or phrase_lower.startswith("table"):
-                return True
-            
-            # 6. Presentation section patterns
-            if re.match(r'^(the\s+)?(perfect|financial|market|problem|solution|team|product)', phrase_lower):
-                # These are often slide section names, not concepts
-                if len(phrase.split()) <= 3:
-                    return True
-                
-            # 7. Standard name checks
-            words = phrase.lower().split()
-            if len(words) > 5:
-                # Filter very long phrases (likely sentences, not concepts)
-                return True
-                
-            # Check for common names
-            if any(w in common_first_names or w in common_last_names for w in words):
-                return True
-                
-            return False
-        
+
         # Extract section headers (lines that are short and capitalized)
-        lines = text.split('\n')
-        for line in lines:
+        for line in text.splitlines():
             line = line.strip()
             words = line.split()
-            if 3 <= len(words) <= 7:
-                caps_ratio = sum(1 for w in words if w and w[0].isupper()) / len(words)
-                if caps_ratio > 0.6 and len(line) < 100:
-                    # Skip if looks like a name or stop phrase
-                    if is_garbage_or_name(line):
-                        continue
-                    if any(sp.lower() in line.lower() for sp in stop_phrases):
-                        continue
-                    concepts.append({
-                        "name": line,
-                        "definition": f"Key topic or section: {line}",
-                        "importance": 8,
-                        "difficulty": "medium",
-                        "category": "Topic"
-                    })
-        
-        # Extract multi-word capitalized phrases (likely concepts)
-        pattern = r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\b'
-        matches = re.findall(pattern, text)
-        
-        # Count frequencies and filter
-        freq = Counter(matches)
+            if not (3 <= len(words) <= 7 and len(line) < 100):
+                continue
+
+            # Fast path: istitle() is a single C-level scan and accepts
+            # most real headers without the per-word ratio count
+            if not line.istitle():
+                caps = sum(w[0].isupper() for w in words)
+                if caps <= 0.6 * len(words):
+                    continue
+
+            # Skip if looks like a name or stop phrase
+            if _is_garbage_or_name(line):
+                continue
+            line_lower = line.lower()
+            if any(sp in line_lower for sp in _STOP_PHRASES_LOWER):
+                continue
+            concepts.append({
+                "name": line,
+                "definition": f"Key topic or section: {line}",
+                "importance": 8,
+                "difficulty": "medium",
+                "category": "Topic"
+            })
         
-        for phrase, count in freq.most_common(max_concepts * 2):
+        # Extract multi-word capitalized phrases (likely concepts), streaming
+        # matches via finditer so only unique phrases are held in memory
+        phrase_counts: Dict[str, int] = {}
+        for match in _CAPS_RE.finditer(text):
+            phrase = match.group(1)
+            phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
+
+        # Rank frequencies in C via numpy argsort
+        ranked = []
+        if phrase_counts:
+            values = list(phrase_counts.keys())
+            counts = np.fromiter(
+                phrase_counts.values(), dtype=np.int64, count=len(values)
+            )
+            order = np.argsort(counts)[::-1][:max_concepts * 2]
+            ranked = [(values[i], int(counts[i])) for i in order]
+
+        for phrase, count in ranked:
             # Skip names and stop phrases
-            if is_garbage_or_name(phrase):
+            if _is_garbage_or_name(phrase):
                 continue
-            if phrase in stop_phrases or any(sp.lower() in phrase.lower() for sp in stop_phrases):
+            phrase_lower = phrase.lower()
+            if phrase in _STOP_PHRASES or any(sp in phrase_lower for sp in _STOP_PHRASES_LOWER):
                 continue
             # Filter noise and only keep if appears 2+ times
             if count >= 2 and len(phrase) > 5:
@@ -325,13 +612,13 @@ Return ONLY the JSON array of relationships:"""
                     "category": "Concept"
                 })
         
-        # De-duplicate by name
+        # De-duplicate by canonical name
         seen = set()
         unique_concepts = []
         for c in concepts:
-            name_lower = c["name"].lower()
-            if name_lower not in seen:
-                seen.add(name_lower)
+            key = _canonical_name(c["name"])
+            if key not in seen:
+                seen.add(key)
                 unique_concepts.append(c)
         
         return unique_concepts[:max_concepts]
@@ -349,40 +636,44 @@ Return ONLY the JSON array of relationships:"""
         Returns:
             Graph data structure for visualization
         """
-        nodes = []
-        edges = []
-        
-        for concept in concepts:
-            nodes.append({
-                "id": concept.get("name", ""),
-                "label": concept.get("name", ""),
-                "importance": concept.get("importance", 5),
-                "difficulty": concept.get("difficulty", "medium"),
-                "category": concept.get("category", "General")
-            })
-            
-            # Add prerequisite edges
-            prereqs = concept.get("prerequisites", "").split(",")
-            for prereq in prereqs:
-                prereq = prereq.strip()
-                if prereq:
-                    edges.append({
-                        "source": prereq,
-                        "target": concept.get("name", ""),
-                        "type": "prerequisite"
-                    })
-            
-            # Add related edges
-            related = concept.get("related_concepts", "").split(",")
-            for rel in related:
-                rel = rel.strip()
-                if rel:
-                    edges.append({
-                        "source": concept.get("name", ""),
-                        "target": rel,
-                        "type": "related"
-                    })
-        
+        # Convert once to slotted Concept objects so the loops below do
+        # attribute loads instead of dict.get chains with defaults
+        typed = [Concept.from_dict(c) for c in concepts]
+
+        nodes = [
+            {
+                "id": c.name,
+                "label": c.name,
+                "importance": c.importance,
+                "difficulty": c.difficulty,
+                "category": c.category
+            }
+            for c in typed
+        ]
+
+        # Explode the comma-joined relationship strings into edges in two
+        # bulk comprehensions instead of per-concept split/strip/append loops
+        edges = [
+            {
+                "source": prereq,
+                "target": c.name,
+                "type": "prerequisite"
+            }
+            for c in typed
+            for prereq in map(str.strip, c.prerequisites.split(","))
+            if prereq
+        ]
+        edges += [
+            {
+                "source": c.name,
+                "target": rel,
+                "type": "related"
+            }
+            for c in typed
+            for rel in map(str.strip, c.related_concepts.split(","))
+            if rel
+        ]
+
         return {
             "nodes": nodes,
             "edges": edges
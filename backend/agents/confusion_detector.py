@@ -4,15 +4,76 @@ StudyBuddy AI - Confusion Detector Agent
 Detects learning confusion patterns from student responses using LLM analysis.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+import asyncio
+import hashlib
 import logging
 import json
 import re
+import unicodedata
 
 from agents.base_agent import BaseAgent
+from core.config import settings
+from core.llm_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
+# Shared JSON decoder; raw_decode handles nested objects and trailing
+# prose that the old flat {[^{}]*} regex rejected
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_json_object(text: str) -> Optional[Dict]:
+    """
+    Extract the first JSON object embedded in LLM prose.
+
+    Tries raw_decode at each '{' so nested braces and surrounding text
+    are handled without regex backtracking.
+    """
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, idx)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        idx = text.find("{", idx + 1)
+    return None
+
+
+_NORM_RE = re.compile(r"\W+")
+
+# Pattern-type templates for the LLM-failure fallback path
+_TERM_CONFUSION_TMPL = "term_confusion_{slug}"
+_MISCONCEPTION_TMPL = "misconception_{slug}"
+
+
+def _norm(s: str) -> str:
+    """Normalize an answer: NFKD, strip punctuation, collapse whitespace."""
+    return _NORM_RE.sub(" ", unicodedata.normalize("NFKD", s)).strip().lower()
+
+
+def _answers_match(user_answer: str, correct_answer: str) -> bool:
+    """
+    Check whether an answer is effectively correct.
+
+    Punctuation/whitespace/unicode variance in free-form answers used to
+    escalate trivially-correct submissions to the LLM; normalized
+    comparison plus a near-verbatim similarity check catches those
+    before any round-trip.
+    """
+    user = _norm(user_answer)
+    correct = _norm(correct_answer)
+    if user == correct:
+        return True
+    return bool(
+        user and correct
+        and SequenceMatcher(None, user, correct).ratio() >= 0.95
+    )
+
 
 class ConfusionDetectorAgent(BaseAgent):
     """
@@ -25,9 +86,29 @@ class ConfusionDetectorAgent(BaseAgent):
     - Tracks patterns by concept area
     """
     
+    # Exact-tier cache bound; misconceptions repeat heavily across a class
+    EXACT_CACHE_MAX = 10_000
+
     def __init__(self):
         super().__init__("ConfusionDetectorAgent")
-    
+        # Two-tier cache: exact key hash first, then embedding similarity.
+        # Classroom workloads see the same wrong answers across students,
+        # so hits skip the LLM round-trip entirely.
+        self._exact_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._semantic_cache = get_semantic_cache("confusion_detector")
+        self._llm_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
+    @staticmethod
+    def _cache_key(
+        question: str,
+        user_answer: str,
+        correct_answer: str,
+        concept_name: str = None
+    ) -> str:
+        """Exact cache key for an answer tuple."""
+        raw = "|".join((question, user_answer, correct_answer, concept_name or ""))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
     async def run(
         self, 
         question: str, 
@@ -54,8 +135,8 @@ class ConfusionDetectorAgent(BaseAgent):
         
         Uses LLM to provide more intelligent analysis than keyword matching.
         """
-        # If answer is correct, no confusion
-        if user_answer.strip().lower() == correct_answer.strip().lower():
+        # If answer is (effectively) correct, no confusion
+        if _answers_match(user_answer, correct_answer):
             return None
         
         # Use LLM for intelligent confusion analysis
@@ -71,6 +152,53 @@ class ConfusionDetectorAgent(BaseAgent):
         # Fallback: Generate meaningful pattern from the question/concept
         return self._generate_meaningful_pattern(question, concept_name, user_answer, correct_answer)
     
+    async def detect_confusion_batch(
+        self,
+        items: List[Tuple[str, str, str, Optional[str], Optional[str]]]
+    ) -> List[Optional[Dict]]:
+        """
+        Analyze a whole quiz submission concurrently.
+
+        Args:
+            items: Tuples of (question, user_answer, correct_answer,
+                concept_id, concept_name), one per answered question
+
+        Returns:
+            One result per item in input order; None for correct answers
+        """
+        results: List[Optional[Dict]] = [None] * len(items)
+
+        # Pre-filter correct answers synchronously; only wrong answers
+        # consume an LLM slot
+        wrong = [
+            (i, item) for i, item in enumerate(items)
+            if not _answers_match(item[1], item[2])
+        ]
+        if not wrong:
+            return results
+
+        # _analyze_with_llm bounds its own LLM concurrency, so cache hits
+        # resolve immediately while misses queue on the semaphore
+        analyses = await asyncio.gather(
+            *(
+                self._analyze_with_llm(q, user, correct, concept_name)
+                for _, (q, user, correct, _cid, concept_name) in wrong
+            ),
+            return_exceptions=True
+        )
+
+        for (i, item), analysis in zip(wrong, analyses):
+            question, user_answer, correct_answer, _concept_id, concept_name = item
+            if isinstance(analysis, BaseException) or analysis is None:
+                if isinstance(analysis, BaseException):
+                    logger.warning(f"LLM confusion analysis failed: {analysis}")
+                analysis = self._generate_meaningful_pattern(
+                    question, concept_name, user_answer, correct_answer
+                )
+            results[i] = analysis
+
+        return results
+
     async def _analyze_with_llm(
         self,
         question: str,
@@ -79,7 +207,22 @@ class ConfusionDetectorAgent(BaseAgent):
         concept_name: str = None
     ) -> Optional[Dict]:
         """Use LLM to analyze the confusion pattern."""
-        
+
+        cache_enabled = settings.enable_confusion_cache
+        if cache_enabled:
+            # Tier 1: exact match on the full answer tuple
+            key = self._cache_key(question, user_answer, correct_answer, concept_name)
+            cached = self._exact_cache.get(key)
+            if cached is not None:
+                self._exact_cache.move_to_end(key)
+                return dict(cached)
+
+            # Tier 2: semantically near-identical question/answer pairs
+            semantic_key = f"{question}\n{user_answer}\n{correct_answer}"
+            cached = await self._semantic_cache.get(semantic_key)
+            if cached is not None:
+                return dict(cached)
+
         prompt = f"""Analyze this incorrect quiz answer and identify the specific confusion or misconception.
 
 QUESTION: {question}
@@ -103,18 +246,28 @@ Return as JSON:
 
 Return ONLY the JSON:"""
 
-        response = await self.llm.generate(prompt, temperature=0.3)
-        
+        # Semaphore keeps a 40-question quiz from stampeding the provider;
+        # generate() handles 429 retry with exponential backoff underneath
+        async with self._llm_semaphore:
+            response = await self.llm.generate(prompt, temperature=0.3)
+
         # Parse JSON response
-        json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group())
+        result = _extract_json_object(response)
+        if result is not None:
             # Ensure required fields exist
             if "pattern_type" in result and "description" in result:
                 result.setdefault("score", 0.7)
                 result.setdefault("intervention", "Review this concept carefully.")
+
+                if cache_enabled:
+                    self._exact_cache[key] = result
+                    self._exact_cache.move_to_end(key)
+                    while len(self._exact_cache) > self.EXACT_CACHE_MAX:
+                        self._exact_cache.popitem(last=False)
+                    await self._semantic_cache.put(semantic_key, result)
+
                 return result
-        
+
         return None
     
     def _generate_meaningful_pattern(
@@ -128,25 +281,27 @@ Return ONLY the JSON:"""
         
         # Try to extract topic from question or concept
         topic = concept_name or "this concept"
-        
+        # Normalize the topic slug once; it feeds two of the branches
+        slug = topic.lower().replace(" ", "_")[:20]
+
         # Determine the type of error based on answer similarity
         user_lower = user_answer.strip().lower()
         correct_lower = correct_answer.strip().lower()
-        
+
         # Check for common error types
         if len(user_lower) < 10 and len(correct_lower) < 10:
             # Short answers - likely confusion between similar terms
-            pattern_type = f"term_confusion_{topic.lower().replace(' ', '_')[:20]}"
+            pattern_type = _TERM_CONFUSION_TMPL.format(slug=slug)
             description = f"Mixed up terminology related to {topic}"
             intervention = f"Review the definitions and differences in {topic}"
-        elif any(word in user_lower for word in correct_lower.split()[:3]):
+        elif not set(correct_lower.split()[:3]).isdisjoint(user_lower.split()):
             # Partial match - incomplete understanding
             pattern_type = "incomplete_understanding"
             description = f"Incomplete understanding of {topic}"
             intervention = f"Study {topic} more thoroughly - you have partial knowledge but missed key details"
         else:
             # Very different answer
-            pattern_type = f"misconception_{topic.lower().replace(' ', '_')[:20]}"
+            pattern_type = _MISCONCEPTION_TMPL.format(slug=slug)
             description = f"Misconception about {topic}"
             intervention = f"Review {topic} from the beginning - your understanding may need correction"
         
@@ -180,33 +335,39 @@ Return ONLY the JSON:"""
                 "recommendations": ["Keep up the good work!"]
             }
         
-        # Group patterns by type
-        pattern_counts = {}
+        # Single pass: count pattern types and remember the first
+        # intervention seen for each, instead of rescanning patterns for
+        # every top type
+        pattern_counts = Counter(
+            p.get("pattern_type", "unknown") for p in patterns
+        )
+        first_intervention = {}
         for p in patterns:
-            ptype = p.get("pattern_type", "unknown")
-            pattern_counts[ptype] = pattern_counts.get(ptype, 0) + 1
-        
-        # Sort by frequency
-        sorted_patterns = sorted(pattern_counts.items(), key=lambda x: -x[1])
-        
-        main_issues = []
-        recommendations = []
-        
-        for ptype, count in sorted_patterns[:3]:
-            main_issues.append({
+            first_intervention.setdefault(
+                p.get("pattern_type", "unknown"),
+                p.get("intervention", "Review this area")
+            )
+
+        top_patterns = pattern_counts.most_common(3)
+
+        main_issues = [
+            {
                 "pattern": ptype.replace("_", " ").title(),
                 "occurrences": count
-            })
-            # Find an intervention for this pattern
-            for p in patterns:
-                if p.get("pattern_type") == ptype:
-                    recommendations.append(p.get("intervention", "Review this area"))
-                    break
-        
+            }
+            for ptype, count in top_patterns
+        ]
+        # dict.fromkeys dedupes while keeping frequency order deterministic
+        recommendations = list(dict.fromkeys(
+            first_intervention[ptype] for ptype, _ in top_patterns
+        ))
+
         return {
             "total_errors": len(patterns),
             "course": course_name,
             "main_issues": main_issues,
-            "recommendations": list(set(recommendations))[:5],
-            "improvement_areas": [p["pattern"].replace("_", " ") for p, _ in sorted_patterns[:3]]
+            "recommendations": recommendations[:5],
+            "improvement_areas": [
+                ptype.replace("_", " ") for ptype, _ in top_patterns
+            ]
         }
@@ -6,7 +6,11 @@ Processes uploaded materials (PDF, DOCX, video, audio).
 
 import os
 import asyncio
-from typing import Dict, List, Any, Optional
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from pathlib import Path
 import logging
 
@@ -15,6 +19,52 @@ from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Shared process pool for CPU-bound per-page PDF extraction; sized lazily
+# so importing this module doesn't spawn workers
+_PDF_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Get the shared PDF extraction process pool."""
+    global _PDF_POOL
+    if _PDF_POOL is None:
+        _PDF_POOL = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 8))
+    return _PDF_POOL
+
+
+# Non-empty paragraph blocks: runs of lines up to the next blank(ish)
+# line. finditer yields them lazily with exact offsets, without
+# materializing the full split("\n\n") list plus per-paragraph strips
+_PARA_RE = re.compile(r"[^\s][^\n]*(?:\n(?!\s*\n)[^\n]*)*")
+
+
+def _hash_file(file_path: str) -> str:
+    """Content hash of a file, streamed in 1 MiB chunks."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _extract_pdf_page(file_path: str, page_num: int) -> str:
+    """
+    Worker: extract text from a single PDF page.
+
+    Reopens the file in the worker process — pdfplumber objects are not
+    picklable and not fork-safe.
+    """
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        page = pdf.pages[page_num]
+        try:
+            return page.extract_text(
+                x_tolerance=2, y_tolerance=2, layout=False
+            ) or ""
+        finally:
+            page.flush_cache()
+
 
 class ContentIngestionAgent(BaseAgent):
     """
@@ -29,9 +79,120 @@ class ContentIngestionAgent(BaseAgent):
     - OCR for images
     """
     
+    # Whisper weighs hundreds of MB; load it once per process, not per file
+    _whisper_model = None
+    _whisper_batched = False
+    _whisper_lock: Optional[asyncio.Lock] = None
+    # Single worker: serializes transcriptions so concurrent uploads
+    # don't duplicate CUDA contexts or thrash one set of model weights
+    _whisper_executor: Optional[ThreadPoolExecutor] = None
+
+    # Batch size for the batched inference pipeline on long recordings
+    WHISPER_BATCH_SIZE = 16
+
     def __init__(self):
         super().__init__("ContentIngestionAgent")
-    
+
+    @classmethod
+    async def warmup(cls) -> None:
+        """
+        Preload the heavyweight extractors at process start.
+
+        Without this the first upload pays cold imports (PyMuPDF,
+        python-docx, python-pptx, pdfplumber), the tesseract traineddata
+        load, and — worst — the multi-hundred-MB Whisper model load on
+        its critical path. Each extractor is optional: anything missing
+        is skipped, matching the per-format fallbacks in _process_*.
+        """
+        def _import_extractors() -> None:
+            for mod in ("pymupdf", "pdfplumber", "docx", "pptx"):
+                try:
+                    __import__(mod)
+                except ImportError:
+                    pass
+
+            try:
+                import pytesseract
+                from PIL import Image
+
+                # OCR of a 1x1 image forces the traineddata mmap
+                pytesseract.image_to_string(Image.new("RGB", (1, 1)))
+            except Exception:
+                pass
+
+        await asyncio.to_thread(_import_extractors)
+
+        try:
+            await cls._get_whisper()
+        except Exception as e:
+            logger.warning(f"Whisper warmup skipped: {e}")
+
+        logger.info("Content extractors warmed up")
+
+    @staticmethod
+    def _whisper_runtime() -> tuple:
+        """
+        Pick the Whisper device and compute type.
+
+        Upgrades to CUDA with int8_float16 (int8 weights, fp16
+        activations on tensor cores) when a GPU is available; otherwise
+        int8 on the configured device.
+        """
+        device = settings.whisper_device
+        if device == "cpu":
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    device = "cuda"
+            except ImportError:
+                pass
+
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        return device, compute_type
+
+    @classmethod
+    async def _get_whisper(cls):
+        """
+        Lazily initialize the shared Whisper model.
+
+        The lock ensures concurrent audio/video uploads don't race to
+        load the weights twice. When faster-whisper provides
+        BatchedInferencePipeline (>=1.0) the model is wrapped in it for
+        batched transcription of long recordings.
+        """
+        if cls._whisper_lock is None:
+            cls._whisper_lock = asyncio.Lock()
+
+        async with cls._whisper_lock:
+            if cls._whisper_model is None:
+                from faster_whisper import WhisperModel
+
+                device, compute_type = cls._whisper_runtime()
+                model = await asyncio.to_thread(
+                    WhisperModel,
+                    settings.whisper_model,
+                    device=device,
+                    compute_type=compute_type
+                )
+
+                try:
+                    from faster_whisper import BatchedInferencePipeline
+                    cls._whisper_model = BatchedInferencePipeline(model=model)
+                    cls._whisper_batched = True
+                except ImportError:
+                    cls._whisper_model = model
+                    cls._whisper_batched = False
+        return cls._whisper_model
+
+    @classmethod
+    def _get_whisper_executor(cls) -> ThreadPoolExecutor:
+        """Get the dedicated single-worker transcription executor."""
+        if cls._whisper_executor is None:
+            cls._whisper_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="whisper"
+            )
+        return cls._whisper_executor
+
     async def run(
         self,
         file_path: str,
@@ -53,32 +214,73 @@ class ContentIngestionAgent(BaseAgent):
         
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-        
+
         # Extract based on file type
         file_type = file_type.lower()
-        
-        if file_type == "pdf":
-            result = await self._process_pdf(file_path)
-        elif file_type in ["docx", "doc"]:
-            result = await self._process_docx(file_path)
-        elif file_type in ["pptx", "ppt"]:
-            result = await self._process_pptx(file_path)
-        elif file_type in ["mp3", "wav", "m4a", "ogg"]:
-            result = await self._process_audio(file_path)
-        elif file_type in ["mp4", "avi", "mov", "mkv"]:
-            result = await self._process_video(file_path)
-        elif file_type in ["png", "jpg", "jpeg"]:
-            result = await self._process_image(file_path)
-        else:
+
+        if file_type not in [
+            "pdf", "docx", "doc", "pptx", "ppt",
+            "mp3", "wav", "m4a", "ogg",
+            "mp4", "avi", "mov", "mkv",
+            "png", "jpg", "jpeg"
+        ]:
             raise ValueError(f"Unsupported file type: {file_type}")
-        
-        # Chunk the content
-        if result.get("text"):
-            result["chunks"] = self._chunk_text(
-                result["text"],
-                source=os.path.basename(file_path),
-                material_id=material_id
-            )
+
+        # Re-ingesting an identical file (re-index, retry after a failed
+        # embedding pass) skips parsing/transcription entirely. Only the
+        # extracted text + metadata is cached — chunks depend on
+        # material_id and are rebuilt below.
+        digest = await asyncio.to_thread(_hash_file, file_path)
+        result = await asyncio.to_thread(self._load_cached_extraction, digest)
+
+        if result is None:
+            if file_type == "pdf":
+                result = await self._process_pdf(file_path)
+            elif file_type in ["docx", "doc"]:
+                result = await self._process_docx(file_path)
+            elif file_type in ["pptx", "ppt"]:
+                result = await self._process_pptx(file_path)
+            elif file_type in ["mp3", "wav", "m4a", "ogg"]:
+                result = await self._process_audio(
+                    file_path,
+                    source=os.path.basename(file_path),
+                    material_id=material_id
+                )
+            elif file_type in ["mp4", "avi", "mov", "mkv"]:
+                result = await self._process_video(
+                    file_path, material_id=material_id
+                )
+            elif file_type in ["png", "jpg", "jpeg"]:
+                result = await self._process_image(file_path)
+
+            if result.get("text") and not result.get("error"):
+                # Chunks depend on material_id — never cache them
+                cacheable = {k: v for k, v in result.items() if k != "chunks"}
+                await asyncio.to_thread(
+                    self._store_extraction, digest, cacheable
+                )
+
+        # Chunk the content (audio chunks incrementally during
+        # transcription, so it arrives here already chunked)
+        if result.get("text") and "chunks" not in result:
+            if result.get("source_type") in ("audio", "video"):
+                # Cache replays of transcripts: the text was joined with
+                # spaces, so the paragraph chunker would see one giant
+                # paragraph and emit a single oversized chunk. Re-chunk
+                # the word stream with the same separator the first
+                # pass used.
+                result["chunks"] = list(self._chunk_text_stream(
+                    iter(result["text"].split(" ")),
+                    source=os.path.basename(file_path),
+                    material_id=material_id,
+                    separator=" "
+                ))
+            else:
+                result["chunks"] = self._chunk_text(
+                    result["text"],
+                    source=os.path.basename(file_path),
+                    material_id=material_id
+                )
         
         self._log_action("File processed", {
             "file": file_path,
@@ -87,22 +289,120 @@ class ContentIngestionAgent(BaseAgent):
         })
         
         return result
-    
+
+    @staticmethod
+    def _cache_file(digest: str) -> Path:
+        """Cache file path for a content digest."""
+        return Path(settings.extraction_cache_dir) / f"{digest}.json"
+
+    @classmethod
+    def _load_cached_extraction(cls, digest: str) -> Optional[Dict[str, Any]]:
+        """Load a cached extraction result, or None on miss."""
+        path = cls._cache_file(digest)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            # Touch for the LRU sweep
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed: {e}")
+            return None
+
+    @classmethod
+    def _store_extraction(cls, digest: str, result: Dict[str, Any]) -> None:
+        """Atomically persist an extraction result and sweep old entries."""
+        path = cls._cache_file(digest)
+        try:
+            tmp = path.with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+
+            # Size-bound the cache: evict least-recently-used entries
+            entries = sorted(
+                path.parent.glob("*.json"),
+                key=lambda p: p.stat().st_mtime
+            )
+            for stale in entries[:-settings.extraction_cache_max_entries]:
+                stale.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed: {e}")
+
+    # Below this page count the process-pool overhead outweighs the win
+    PDF_PARALLEL_THRESHOLD = 10
+
     async def _process_pdf(self, file_path: str) -> Dict[str, Any]:
         """Extract text from PDF."""
+        # Primary: PyMuPDF — native MuPDF extraction, typically an order
+        # of magnitude faster than pdfplumber's pure-Python layout engine
+        # when only concatenated text is needed
+        try:
+            import pymupdf
+
+            def _extract() -> tuple:
+                with pymupdf.open(file_path) as doc:
+                    return [page.get_text("text") for page in doc], doc.page_count
+
+            text_parts, num_pages = await asyncio.to_thread(_extract)
+            text = "\n\n".join(t for t in text_parts if t)
+
+            # Scanned or oddly-encoded PDFs can come back near-empty;
+            # retry with pdfplumber's layout analysis before giving up
+            if len(text) >= 100 or num_pages <= 5:
+                return {
+                    "text": text,
+                    "num_pages": num_pages,
+                    "source_type": "pdf"
+                }
+            logger.warning(
+                f"PyMuPDF extracted only {len(text)} chars from "
+                f"{num_pages} pages, retrying with pdfplumber"
+            )
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"PyMuPDF failed, trying pdfplumber: {e}")
+
         try:
             import pdfplumber
-            
-            text_parts = []
-            num_pages = 0
-            
-            with pdfplumber.open(file_path) as pdf:
-                num_pages = len(pdf.pages)
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-            
+
+            def _extract_serial() -> tuple:
+                parts = []
+                with pdfplumber.open(file_path) as pdf:
+                    pages = len(pdf.pages)
+                    if pages >= self.PDF_PARALLEL_THRESHOLD:
+                        return parts, pages
+                    for page in pdf.pages:
+                        # Explicit tolerances with layout=False skip the
+                        # positional re-layout pass; we only need the
+                        # concatenated text, never tables or bboxes
+                        page_text = page.extract_text(
+                            x_tolerance=2, y_tolerance=2, layout=False
+                        )
+                        # Drop the page's cached objects/images before
+                        # moving on so a big PDF doesn't accumulate them
+                        page.flush_cache()
+                        if page_text:
+                            parts.append(page_text)
+                return parts, pages
+
+            text_parts, num_pages = await asyncio.to_thread(_extract_serial)
+
+            if num_pages >= self.PDF_PARALLEL_THRESHOLD:
+                # pdfplumber's layout analysis is CPU-bound pure Python;
+                # farm pages out to worker processes to escape the GIL,
+                # keeping page order by index
+                loop = asyncio.get_running_loop()
+                pool = _get_pdf_pool()
+                page_texts = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _extract_pdf_page, file_path, i)
+                    for i in range(num_pages)
+                ))
+                text_parts = [t for t in page_texts if t]
+
             return {
                 "text": "\n\n".join(text_parts),
                 "num_pages": num_pages,
@@ -113,18 +413,21 @@ class ContentIngestionAgent(BaseAgent):
             
             try:
                 from PyPDF2 import PdfReader
-                
-                reader = PdfReader(file_path)
-                text_parts = []
-                
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-                
+
+                def _extract_pypdf2() -> tuple:
+                    reader = PdfReader(file_path)
+                    parts = []
+                    for page in reader.pages:
+                        text = page.extract_text()
+                        if text:
+                            parts.append(text)
+                    return parts, len(reader.pages)
+
+                text_parts, num_pages = await asyncio.to_thread(_extract_pypdf2)
+
                 return {
                     "text": "\n\n".join(text_parts),
-                    "num_pages": len(reader.pages),
+                    "num_pages": num_pages,
                     "source_type": "pdf"
                 }
             except Exception as e2:
@@ -135,21 +438,25 @@ class ContentIngestionAgent(BaseAgent):
         """Extract text from DOCX."""
         try:
             from docx import Document
-            
-            doc = Document(file_path)
-            text_parts = []
-            
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-            
-            # Also extract from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_parts.append(cell.text)
-            
+
+            def _extract() -> List[str]:
+                doc = Document(file_path)
+                parts = []
+
+                for para in doc.paragraphs:
+                    if para.text.strip():
+                        parts.append(para.text)
+
+                # Also extract from tables
+                for table in doc.tables:
+                    for row in table.rows:
+                        for cell in row.cells:
+                            if cell.text.strip():
+                                parts.append(cell.text)
+                return parts
+
+            text_parts = await asyncio.to_thread(_extract)
+
             return {
                 "text": "\n\n".join(text_parts),
                 "source_type": "docx"
@@ -162,78 +469,159 @@ class ContentIngestionAgent(BaseAgent):
         """Extract text from PPTX."""
         try:
             from pptx import Presentation
-            
-            prs = Presentation(file_path)
-            text_parts = []
-            
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_text = [f"--- Slide {slide_num} ---"]
-                
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_text.append(shape.text)
-                
-                text_parts.append("\n".join(slide_text))
-            
+
+            def _extract() -> tuple:
+                prs = Presentation(file_path)
+                parts = []
+
+                for slide_num, slide in enumerate(prs.slides, 1):
+                    slide_text = [f"--- Slide {slide_num} ---"]
+
+                    for shape in slide.shapes:
+                        if hasattr(shape, "text") and shape.text.strip():
+                            slide_text.append(shape.text)
+
+                    parts.append("\n".join(slide_text))
+                return parts, len(prs.slides)
+
+            text_parts, num_slides = await asyncio.to_thread(_extract)
+
             return {
                 "text": "\n\n".join(text_parts),
-                "num_slides": len(prs.slides),
+                "num_slides": num_slides,
                 "source_type": "pptx"
             }
         except Exception as e:
             logger.error(f"PPTX extraction failed: {e}")
             return {"text": "", "error": str(e)}
     
-    async def _process_audio(self, file_path: str) -> Dict[str, Any]:
-        """Transcribe audio using Whisper."""
+    async def _process_audio(
+        self,
+        audio,
+        source: str = None,
+        material_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        Transcribe audio using Whisper.
+
+        Segments are chunked incrementally as the (lazy) transcription
+        generator produces them, instead of materializing every segment
+        before chunking can begin.
+
+        Args:
+            audio: Path to an audio file, or a float32 numpy array of
+                16kHz mono samples (as produced by _process_video)
+            source: Source filename for chunk provenance
+            material_id: Material ID for chunk provenance
+        """
         try:
-            from faster_whisper import WhisperModel
-            
-            model = WhisperModel(
-                settings.whisper_model,
-                device=settings.whisper_device,
-                compute_type="int8"
+            model = await self._get_whisper()
+
+            # Decoding happens while the segments generator is iterated,
+            # so the whole transcribe+chunk loop runs on the dedicated
+            # single-worker executor instead of blocking the event loop
+            def _transcribe() -> tuple:
+                if self._whisper_batched:
+                    segments, info = model.transcribe(
+                        audio, batch_size=self.WHISPER_BATCH_SIZE, beam_size=5
+                    )
+                else:
+                    segments, info = model.transcribe(audio, beam_size=5)
+
+                text_parts = []
+
+                def _stream_segments() -> Iterator[str]:
+                    for segment in segments:
+                        text_parts.append(segment.text)
+                        yield segment.text
+
+                chunks = list(self._chunk_text_stream(
+                    _stream_segments(),
+                    source=source or "audio",
+                    material_id=material_id,
+                    separator=" "
+                ))
+                return text_parts, chunks, info
+
+            loop = asyncio.get_running_loop()
+            text_parts, chunks, info = await loop.run_in_executor(
+                self._get_whisper_executor(), _transcribe
             )
-            
-            segments, info = model.transcribe(file_path, beam_size=5)
-            
-            text_parts = []
-            for segment in segments:
-                text_parts.append(segment.text)
-            
+
             return {
                 "text": " ".join(text_parts),
                 "duration_seconds": int(info.duration),
                 "language": info.language,
-                "source_type": "audio"
+                "source_type": "audio",
+                "chunks": chunks
             }
         except Exception as e:
             logger.error(f"Audio transcription failed: {e}")
             return {"text": "", "error": str(e)}
     
-    async def _process_video(self, file_path: str) -> Dict[str, Any]:
+    async def _process_video(
+        self,
+        file_path: str,
+        material_id: str = None
+    ) -> Dict[str, Any]:
         """Extract audio from video and transcribe."""
+        # Primary: stream 16kHz mono PCM straight out of ffmpeg into
+        # Whisper — no temp WAV and no full decoded copy in memory
+        try:
+            import numpy as np
+
+            proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-i", file_path,
+                "-vn", "-ac", "1", "-ar", "16000",
+                "-f", "s16le", "-loglevel", "error", "pipe:1",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            pcm, err = await proc.communicate()
+
+            if proc.returncode == 0 and pcm:
+                samples = np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+                result = await self._process_audio(
+                    samples,
+                    source=os.path.basename(file_path),
+                    material_id=material_id
+                )
+                result["source_type"] = "video"
+                return result
+
+            logger.warning(
+                f"ffmpeg audio extraction failed: {err.decode(errors='ignore').strip()}"
+            )
+        except FileNotFoundError:
+            logger.warning("ffmpeg binary not found, falling back to pydub")
+        except Exception as e:
+            logger.warning(f"Streaming audio extraction failed: {e}")
+
+        # Fallback: pydub decode + temp WAV
         try:
-            # Extract audio using pydub
             from pydub import AudioSegment
-            
+
             # Load video and extract audio
             audio = AudioSegment.from_file(file_path)
-            
+
             # Save as temp WAV
             temp_audio = file_path + ".temp.wav"
             audio.export(temp_audio, format="wav")
-            
+
             try:
                 # Transcribe the audio
-                result = await self._process_audio(temp_audio)
+                result = await self._process_audio(
+                    temp_audio,
+                    source=os.path.basename(file_path),
+                    material_id=material_id
+                )
                 result["source_type"] = "video"
                 return result
             finally:
                 # Clean up temp file
                 if os.path.exists(temp_audio):
                     os.remove(temp_audio)
-                    
+
         except Exception as e:
             logger.error(f"Video processing failed: {e}")
             return {"text": "", "error": str(e)}
@@ -243,10 +631,12 @@ class ContentIngestionAgent(BaseAgent):
         try:
             import pytesseract
             from PIL import Image
-            
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
-            
+
+            def _ocr() -> str:
+                return pytesseract.image_to_string(Image.open(file_path))
+
+            text = await asyncio.to_thread(_ocr)
+
             return {
                 "text": text.strip(),
                 "source_type": "image"
@@ -255,6 +645,60 @@ class ContentIngestionAgent(BaseAgent):
             logger.error(f"OCR failed: {e}")
             return {"text": "", "error": str(e)}
     
+    async def _process_images_batch(
+        self,
+        paths: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        OCR a batch of images with a single tesseract invocation.
+
+        pytesseract forks a tesseract process per image (~200ms startup
+        each); passing a newline-delimited list file amortizes that
+        across the whole batch. Falls back to per-image OCR when the
+        tesseract binary isn't directly invocable.
+
+        Args:
+            paths: Image file paths
+
+        Returns:
+            One result dict per path, in input order
+        """
+        if not paths:
+            return []
+        if len(paths) == 1:
+            return [await self._process_image(paths[0])]
+
+        try:
+            import tempfile
+
+            with tempfile.TemporaryDirectory() as tmp:
+                list_file = os.path.join(tmp, "images.txt")
+                with open(list_file, "w") as f:
+                    f.write("\n".join(paths))
+
+                out_base = os.path.join(tmp, "ocr_out")
+                proc = await asyncio.create_subprocess_exec(
+                    "tesseract", list_file, out_base, "-l", "eng",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                _, err = await proc.communicate()
+
+                if proc.returncode != 0:
+                    raise RuntimeError(err.decode(errors="ignore").strip())
+
+                # tesseract concatenates pages separated by form feeds
+                with open(out_base + ".txt") as f:
+                    pages = f.read().split("\f")
+
+            return [
+                {"text": page.strip(), "source_type": "image"}
+                for page in pages[:len(paths)]
+            ]
+        except Exception as e:
+            logger.warning(f"Batched OCR failed, falling back to per-image: {e}")
+            return [await self._process_image(p) for p in paths]
+
     def _chunk_text(
         self,
         text: str,
@@ -278,56 +722,222 @@ class ContentIngestionAgent(BaseAgent):
         """
         chunk_size = chunk_size or settings.chunk_size * 4  # ~4 chars per token
         overlap = overlap or settings.chunk_overlap * 4
-        
+
         if not text:
             return []
-        
-        # Split by paragraphs first
-        paragraphs = text.split("\n\n")
-        
+
+        # Mass path: on multi-hundred-KB transcripts the per-paragraph
+        # Python loop below dominates; derive boundaries with numpy
+        if len(text) > self.LARGE_DOC_THRESHOLD:
+            return self._chunk_text_large(
+                text, source, material_id, chunk_size, overlap
+            )
+
         chunks = []
-        current_chunk = ""
-        current_start = 0
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            
-            # If adding this paragraph exceeds chunk size
-            if len(current_chunk) + len(para) > chunk_size:
-                if current_chunk:
-                    chunks.append({
-                        "text": current_chunk.strip(),
-                        "source": source,
-                        "material_id": material_id,
-                        "start_char": current_start,
-                        "end_char": current_start + len(current_chunk),
-                        "chunk_id": f"{material_id}_{len(chunks)}"
-                    })
-                
-                # Start new chunk with overlap
-                if overlap > 0 and current_chunk:
-                    # Include last part of previous chunk
-                    current_chunk = current_chunk[-overlap:] + "\n\n" + para
-                else:
-                    current_chunk = para
-                current_start = current_start + len(current_chunk) - len(para)
-            else:
-                if current_chunk:
-                    current_chunk += "\n\n" + para
-                else:
-                    current_chunk = para
-        
-        # Don't forget the last chunk
-        if current_chunk.strip():
+        # Buffer paragraphs and join once per emitted chunk; the old
+        # current_chunk += ... pattern reallocated the whole chunk string
+        # for every paragraph (quadratic on large documents)
+        buf: List[str] = []
+        # True offset of each buffered paragraph in the source text, so
+        # start_char/end_char give accurate provenance for citations
+        buf_offsets: List[int] = []
+        buf_len = 0
+
+        def _emit(chunk_text: str) -> None:
+            start = buf_offsets[0]
             chunks.append({
-                "text": current_chunk.strip(),
+                "text": chunk_text,
                 "source": source,
                 "material_id": material_id,
-                "start_char": current_start,
-                "end_char": current_start + len(current_chunk),
+                "start_char": start,
+                "end_char": start + len(chunk_text),
                 "chunk_id": f"{material_id}_{len(chunks)}"
             })
-        
+
+        # Paragraphs stream out of the regex with their true offsets;
+        # blank runs are never allocated at all
+        for m in _PARA_RE.finditer(text):
+            para = m.group().rstrip()
+            para_offset = m.start()
+
+            # If adding this paragraph exceeds chunk size
+            if buf and buf_len + len(para) > chunk_size:
+                _emit("\n\n".join(buf))
+
+                # Roll over whole tail paragraphs totalling <= overlap chars
+                # instead of slicing mid-paragraph, keeping offsets exact
+                keep = 0
+                if overlap > 0:
+                    keep_len = 0
+                    for p in reversed(buf):
+                        added = len(p) + (2 if keep else 0)
+                        if keep_len + added > overlap:
+                            break
+                        keep_len += added
+                        keep += 1
+                buf = buf[len(buf) - keep:]
+                buf_offsets = buf_offsets[len(buf_offsets) - keep:]
+
+                buf.append(para)
+                buf_offsets.append(para_offset)
+                buf_len = sum(len(p) for p in buf) + 2 * (len(buf) - 1)
+            else:
+                buf_len += (2 + len(para)) if buf else len(para)
+                buf.append(para)
+                buf_offsets.append(para_offset)
+
+        # Don't forget the last chunk
+        if buf:
+            _emit("\n\n".join(buf))
+
         return chunks
+
+    # Above this size _chunk_text switches to the numpy boundary path;
+    # smaller documents don't amortize the array setup
+    LARGE_DOC_THRESHOLD = 200_000
+
+    def _chunk_text_large(
+        self,
+        text: str,
+        source: str,
+        material_id: str,
+        chunk_size: int,
+        overlap: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunk a very large document via numpy boundary arithmetic.
+
+        Paragraph start/end offsets go into int64 arrays once, and each
+        chunk boundary is found with np.searchsorted instead of walking
+        paragraphs in Python — O(chunks) loop iterations rather than
+        O(paragraphs). Paragraphs are sliced from the source text
+        verbatim, so offsets stay exact.
+        """
+        import numpy as np
+
+        # "\n\n" separator positions -> paragraph [start, end) offsets
+        seps = np.array(
+            [m.start() for m in re.finditer("\n\n", text)], dtype=np.int64
+        )
+        starts = np.concatenate(([0], seps + 2))
+        ends = np.concatenate((seps, [len(text)]))
+        num_paras = len(starts)
+
+        chunks: List[Dict[str, Any]] = []
+        i = 0
+        while i < num_paras:
+            # Last paragraph whose end still fits within chunk_size
+            j = int(np.searchsorted(ends, starts[i] + chunk_size, "right")) - 1
+            # A single oversized paragraph becomes its own chunk, same
+            # as the buffering path
+            j = max(j, i)
+
+            start = int(starts[i])
+            end = int(ends[j])
+            chunk_text = text[start:end].strip()
+            if chunk_text:
+                chunks.append({
+                    "text": chunk_text,
+                    "source": source,
+                    "material_id": material_id,
+                    "start_char": start,
+                    "end_char": start + len(chunk_text),
+                    "chunk_id": f"{material_id}_{len(chunks)}"
+                })
+
+            if j + 1 >= num_paras:
+                break
+            # Next chunk starts at the first paragraph inside the
+            # overlap window, but always advances past i
+            i = max(
+                int(np.searchsorted(starts, end - overlap, "left")), i + 1
+            )
+
+        return chunks
+
+    def _chunk_text_stream(
+        self,
+        pieces: Iterable[str],
+        source: str,
+        material_id: str = None,
+        chunk_size: int = None,
+        overlap: int = None,
+        separator: str = "\n\n"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Incrementally chunk an iterable of text pieces as they arrive.
+
+        Unlike _chunk_text this never needs the full document up front:
+        chunks are yielded as soon as the running buffer fills, so
+        downstream work can start while a lazy producer (e.g. Whisper's
+        segment generator) is still running. Offsets are relative to the
+        separator-joined text the caller assembles.
+
+        Args:
+            pieces: Lazy iterable of text pieces (paragraphs, segments)
+            source: Source filename
+            material_id: Material ID
+            chunk_size: Target chunk size in characters
+            overlap: Overlap between chunks
+            separator: Joiner between pieces within a chunk
+
+        Yields:
+            Chunk dictionaries in document order
+        """
+        chunk_size = chunk_size or settings.chunk_size * 4
+        overlap = overlap or settings.chunk_overlap * 4
+        sep_len = len(separator)
+
+        buf: List[str] = []
+        buf_offsets: List[int] = []
+        buf_len = 0
+        emitted = 0
+        cursor = 0
+
+        def _make(chunk_text: str) -> Dict[str, Any]:
+            nonlocal emitted
+            start = buf_offsets[0]
+            chunk = {
+                "text": chunk_text,
+                "source": source,
+                "material_id": material_id,
+                "start_char": start,
+                "end_char": start + len(chunk_text),
+                "chunk_id": f"{material_id}_{emitted}"
+            }
+            emitted += 1
+            return chunk
+
+        for raw in pieces:
+            piece = raw.strip()
+            offset = cursor + (len(raw) - len(raw.lstrip()))
+            cursor += len(raw) + sep_len
+
+            if not piece:
+                continue
+
+            if buf and buf_len + len(piece) > chunk_size:
+                yield _make(separator.join(buf))
+
+                keep = 0
+                if overlap > 0:
+                    keep_len = 0
+                    for p in reversed(buf):
+                        added = len(p) + (sep_len if keep else 0)
+                        if keep_len + added > overlap:
+                            break
+                        keep_len += added
+                        keep += 1
+                buf = buf[len(buf) - keep:]
+                buf_offsets = buf_offsets[len(buf_offsets) - keep:]
+
+                buf.append(piece)
+                buf_offsets.append(offset)
+                buf_len = sum(len(p) for p in buf) + sep_len * (len(buf) - 1)
+            else:
+                buf_len += (sep_len + len(piece)) if buf else len(piece)
+                buf.append(piece)
+                buf_offsets.append(offset)
+
+        if buf:
+            yield _make(separator.join(buf))
@@ -5,14 +5,26 @@ Analyzes exam patterns and predicts likely questions.
 """
 
 from typing import Dict, List, Any, Optional
+import asyncio
 import logging
-import json
-import re
+
+import orjson
 
 from agents.base_agent import BaseAgent
+from core.json_utils import parse_json_response
+from core.llm_cache import cached_generate
+from core.ranking import top_k
 
 logger = logging.getLogger(__name__)
 
+# No local tokenizer ships with the Gemini SDK, so prompt budgets are
+# estimated at ~4 chars per token — close enough for packing decisions
+_CHARS_PER_TOKEN = 4
+_EXAM_TOKEN_BUDGET = 3000
+_CONCEPT_TOKEN_BUDGET = 400
+
+_EXAM_SEPARATOR = "\n\n=== EXAM ===\n\n"
+
 
 class ExamAnalyzerAgent(BaseAgent):
     """
@@ -55,11 +67,12 @@ class ExamAnalyzerAgent(BaseAgent):
         else:
             analysis = await self._predict_without_history(concepts, course_info)
         
-        # Update concept probabilities
+        # Update concept probabilities; hoist the weights dict out of the loop
+        weights = analysis.get("topic_weights") or {}
         for concept in concepts:
-            name = concept.get("name", "").lower()
-            if name in analysis.get("topic_weights", {}):
-                concept["exam_probability"] = analysis["topic_weights"][name]
+            p = weights.get(concept.get("name", "").lower())
+            if p is not None:
+                concept["exam_probability"] = p
         
         self._log_action("Analysis complete", {
             "predictions": len(analysis.get("predicted_topics", []))
@@ -82,17 +95,14 @@ class ExamAnalyzerAgent(BaseAgent):
         Returns:
             Analysis with patterns and predictions
         """
-        # Combine all exam text
-        exam_text = "\n\n=== EXAM ===\n\n".join(exams)
-        concept_names = [c.get("name", "") for c in concepts]
+        # Pack newest exams first into the token budget instead of a
+        # blunt character slice that could cut mid-sentence
+        exam_text = self._pack_exams(exams)
+        concept_names = self._pack_concepts(concepts)
         
-        prompt = f"""Analyze these past exams and identify patterns for predicting future exam content.
-
-PAST EXAMS:
-{exam_text[:8000]}
-
-KNOWN CONCEPTS:
-{json.dumps(concept_names[:50], indent=2)}
+        # Static instruction block first, dynamic exam text last, so
+        # provider prompt caches hit on the shared prefix
+        prompt = f"""Analyze past exams and identify patterns for predicting future exam content.
 
 Analyze and provide:
 1. Question types commonly used (MCQ, short answer, essay, problem-solving)
@@ -113,20 +123,89 @@ Return as JSON:
   "topic_weights": {{"topic1": 0.9, "topic2": 0.7}}
 }}
 
+PAST EXAMS:
+{exam_text}
+
+KNOWN CONCEPTS:
+{orjson.dumps(concept_names, option=orjson.OPT_INDENT_2).decode()}
+
 Return ONLY the JSON:"""
 
         try:
-            response = await self.llm.generate(prompt, temperature=0.3)
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            
-            if json_match:
-                return json.loads(json_match.group())
+            response = await cached_generate(self.llm, prompt, temperature=0.3, json_kind="object")
+            analysis = parse_json_response(response, "object")
+            if analysis is not None:
+                return analysis
         except Exception as e:
             logger.warning(f"Past exam analysis failed: {e}")
         
         # Fallback
         return self._basic_analysis(concepts)
     
+    @staticmethod
+    def _pack_exams(exams: List[str], token_budget: int = _EXAM_TOKEN_BUDGET) -> str:
+        """
+        Fit exam texts into a token budget, newest first.
+
+        Exams are assumed chronological, so packing walks the list from
+        the end; an exam that does not fit whole is trimmed at the last
+        line break inside the remaining budget rather than mid-sentence.
+
+        Args:
+            exams: Exam texts in chronological order
+            token_budget: Approximate token allowance for the excerpts
+
+        Returns:
+            Joined exam excerpts within budget
+        """
+        budget = token_budget * _CHARS_PER_TOKEN
+        picked = []
+
+        for exam in reversed(exams):
+            if budget <= len(_EXAM_SEPARATOR):
+                break
+            excerpt = exam[:budget]
+            if len(excerpt) < len(exam):
+                # Trim back to a line boundary when truncating
+                cut = excerpt.rfind("\n")
+                if cut > 0:
+                    excerpt = excerpt[:cut]
+            picked.append(excerpt)
+            budget -= len(excerpt) + len(_EXAM_SEPARATOR)
+
+        picked.reverse()
+        return _EXAM_SEPARATOR.join(picked)
+
+    @staticmethod
+    def _pack_concepts(
+        concepts: List[Dict[str, Any]],
+        token_budget: int = _CONCEPT_TOKEN_BUDGET
+    ) -> List[str]:
+        """
+        Select concept names by importance until the budget is spent.
+
+        Args:
+            concepts: Course concepts
+            token_budget: Approximate token allowance for the name list
+
+        Returns:
+            Concept names, most important first
+        """
+        budget = token_budget * _CHARS_PER_TOKEN
+        names = []
+
+        ranked = top_k(
+            concepts, lambda c: c.get("importance_score", 5), len(concepts)
+        )
+        for concept in ranked:
+            name = concept.get("name", "")
+            if len(name) > budget:
+                break
+            names.append(name)
+            budget -= len(name) + 8  # quoting/indent overhead per entry
+
+        return names
+
     async def _predict_without_history(
         self,
         concepts: List[Dict[str, Any]],
@@ -140,17 +219,17 @@ Return ONLY the JSON:"""
         - Concept difficulty
         - Common exam patterns
         """
-        # Sort by importance
-        sorted_concepts = sorted(
+        # Top concepts by importance, weighted by review count
+        top_concepts = top_k(
             concepts,
-            key=lambda c: c.get("importance_score", 5) * (1 + c.get("times_reviewed", 0) * 0.1),
-            reverse=True
+            lambda c: c.get("importance_score", 5) * (1 + c.get("times_reviewed", 0) * 0.1),
+            20
         )
-        
+
         predicted_topics = []
         topic_weights = {}
-        
-        for concept in sorted_concepts[:20]:
+
+        for concept in top_concepts:
             importance = concept.get("importance_score", 5)
             difficulty = concept.get("difficulty", "medium")
             
@@ -194,13 +273,22 @@ Return ONLY the JSON:"""
     
     def _basic_analysis(self, concepts: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Fallback analysis without LLM."""
-        topic_weights = {}
-        
-        for concept in concepts:
-            name = concept.get("name", "").lower()
-            importance = concept.get("importance_score", 5)
-            topic_weights[name] = importance / 10.0
-        
+        if len(concepts) > 1000:
+            # Vectorize the divide for very large courses
+            import numpy as np
+            names = [c.get("name", "").lower() for c in concepts]
+            scores = np.fromiter(
+                (c.get("importance_score", 5) for c in concepts),
+                np.float32,
+                len(concepts)
+            ) * 0.1
+            topic_weights = dict(zip(names, scores.tolist()))
+        else:
+            topic_weights = {
+                c.get("name", "").lower(): c.get("importance_score", 5) / 10.0
+                for c in concepts
+            }
+
         return {
             "question_types": {"mcq": 0.5, "short_answer": 0.3, "essay": 0.2},
             "frequent_topics": [],
@@ -225,54 +313,54 @@ Return ONLY the JSON:"""
         Returns:
             List of predicted questions
         """
-        # Sort by exam probability
-        sorted_concepts = sorted(
+        # Select top concepts by exam probability
+        top_concepts = top_k(
             concepts,
-            key=lambda c: c.get("exam_probability", 0.5),
-            reverse=True
+            lambda c: c.get("exam_probability", 0.5),
+            num_questions
         )
-        
-        # Select top concepts
-        top_concepts = sorted_concepts[:min(num_questions, len(sorted_concepts))]
-        
-        prompt = f"""Generate {num_questions} predicted exam questions based on these high-probability topics:
 
-TOPICS (with probability of appearing):
-{json.dumps([{"topic": c.get("name"), "probability": c.get("exam_probability", 0.5)} for c in top_concepts], indent=2)}
+        # One small concurrent call per question instead of a single
+        # mega-prompt: a bad parse loses one item, not the whole batch,
+        # and network latency overlaps across questions
+        tasks = [self._gen_one(c) for c in top_concepts[:num_questions]]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        return [r for r in results if isinstance(r, dict)]
+
+    async def _gen_one(self, concept: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generate a single predicted question for one concept."""
+        name = concept.get("name", "Unknown")
+        probability = concept.get("exam_probability", 0.5)
 
-Generate exam-style questions that cover these topics.
-Vary question types: MCQ, short answer, essay, problem-solving.
+        prompt = f"""Generate ONE predicted exam question for the topic "{name}" (probability of appearing: {probability}).
 
-Return as JSON array:
-[
-  {{
-    "question": "Question text",
-    "type": "mcq|short_answer|essay|problem_solving",
-    "topic": "Related topic",
-    "difficulty": "easy|medium|hard",
-    "probability": 0.85
-  }}
-]
+Pick a fitting question type: MCQ, short answer, essay, or problem-solving.
 
-Return ONLY the JSON array:"""
+Return as JSON:
+{{
+  "question": "Question text",
+  "type": "mcq|short_answer|essay|problem_solving",
+  "topic": "{name}",
+  "difficulty": "easy|medium|hard",
+  "probability": {probability}
+}}
+
+Return ONLY the JSON:"""
 
         try:
-            response = await self.llm.generate(prompt, temperature=0.7)
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            
-            if json_match:
-                return json.loads(json_match.group())
+            response = await cached_generate(self.llm, prompt, temperature=0.6, json_kind="object")
+            question = parse_json_response(response, "object")
+            if question is not None:
+                return question
         except Exception as e:
-            logger.warning(f"Question generation failed: {e}")
-        
-        # Fallback questions
-        return [
-            {
-                "question": f"Explain the concept of {c.get('name', 'Unknown')}.",
-                "type": "short_answer",
-                "topic": c.get("name", "Unknown"),
-                "difficulty": c.get("difficulty", "medium"),
-                "probability": c.get("exam_probability", 0.5)
-            }
-            for c in top_concepts
-        ]
+            logger.warning(f"Question generation failed for '{name}': {e}")
+
+        # Fallback question
+        return {
+            "question": f"Explain the concept of {name}.",
+            "type": "short_answer",
+            "topic": name,
+            "difficulty": concept.get("difficulty", "medium"),
+            "probability": probability
+        }
@@ -5,14 +5,40 @@ Predicts likely exam questions based on course content analysis.
 """
 
 from typing import Dict, List, Any, Optional
+import asyncio
 import logging
-import json
-import re
 
 from agents.base_agent import BaseAgent
+from core.json_utils import parse_json_response
+from core.llm_cache import cached_generate
+from core.ranking import top_k
 
 logger = logging.getLogger(__name__)
 
+# Static prompt blocks; only the dynamic middle is interpolated per call
+_PREDICTION_STANDARDS = """EXAM QUESTION REQUIREMENTS:
+- Questions should be exam-realistic and test deep understanding
+- Focus on HIGH exam probability concepts (listed above with percentages)
+- Mix question types: conceptual, application, problem-solving
+- Questions should be challenging but fair
+- Reference specific formulas, algorithms, or examples from the source material
+{solution_instruction}
+
+QUALITY STANDARDS:
+- Questions should be clear and unambiguous
+- Each question should test a specific learning objective
+- Difficulty should match exam standards
+- Questions should require understanding, not just memorization"""
+
+_SOLUTION_STEPS = """Provide a DETAILED, STEP-BY-STEP solution that:
+1. Breaks down the problem clearly
+2. Shows all mathematical derivations or logical reasoning
+3. Explains WHY each step is taken
+4. Provides the final answer with context
+5. Includes key formulas or concepts used
+
+Make the solution educational and thorough, as if explaining to a student who wants to deeply understand the concept."""
+
 
 class ExamPredictorAgent(BaseAgent):
     """
@@ -52,16 +78,14 @@ class ExamPredictorAgent(BaseAgent):
             "num_concepts": len(concepts)
         })
         
-        # Sort concepts by exam probability and importance
-        sorted_concepts = sorted(
+        # Top concepts by exam probability and importance; argpartition
+        # selection instead of fully sorting the concept list
+        top_concepts = top_k(
             concepts,
-            key=lambda c: (c.get("exam_probability", 0) * 0.6 + c.get("importance_score", 0) * 0.4),
-            reverse=True
+            lambda c: c.get("exam_probability", 0) * 0.6 + c.get("importance_score", 0) * 0.4,
+            num_predictions * 2
         )
         
-        # Get top concepts for exam prediction
-        top_concepts = sorted_concepts[:num_predictions * 2]
-        
         # Generate predictions using RAG
         predictions = await self._generate_predictions(
             course_id=course_id,
@@ -87,72 +111,69 @@ class ExamPredictorAgent(BaseAgent):
         from core.vector_store import get_vector_store
         vector_store = get_vector_store()
         
-        # Build concept context
+        # One batched embed+search for all concepts instead of a
+        # round trip to the vector store per concept; run() already
+        # bounded the list, so no second slice here
+        queries = [
+            f"{c.get('name', '')} {c.get('definition', '')}" for c in concepts
+        ]
+        try:
+            batch_results = await asyncio.to_thread(
+                vector_store.batch_search, course_id, queries, 2
+            )
+        except Exception as e:
+            logger.warning(f"Batched RAG retrieval failed: {e}")
+            batch_results = [[] for _ in concepts]
+
+        # Build concept context; related concepts often retrieve the same
+        # chunks, so each chunk enters the prompt only once
         concept_contexts = []
-        for concept in concepts[:num_predictions * 2]:
-            concept_name = concept.get("name", "")
-            concept_def = concept.get("definition", "")
-            exam_prob = concept.get("exam_probability", 0)
-            importance = concept.get("importance_score", 0)
-            
-            # Get RAG context
+        seen_chunk_ids: set = set()
+        for concept, chunks in zip(concepts, batch_results):
             rag_text = ""
-            try:
-                chunks = vector_store.search(
-                    course_id=course_id,
-                    query=f"{concept_name} {concept_def}",
-                    top_k=2
-                )
-                if chunks:
-                    rag_text = "\n".join([c.get("text", "")[:300] for c in chunks])
-            except Exception as e:
-                logger.warning(f"RAG retrieval failed for {concept_name}: {e}")
-            
+            if chunks:
+                fresh = [
+                    c for c in chunks
+                    if c.get("chunk_id") not in seen_chunk_ids
+                ]
+                seen_chunk_ids.update(c.get("chunk_id") for c in fresh)
+                rag_text = "\n".join(c.get("text", "")[:200] for c in fresh)
+
             concept_contexts.append({
-                "name": concept_name,
-                "definition": concept_def,
-                "exam_probability": exam_prob,
-                "importance": importance,
+                "name": concept.get("name", ""),
+                "definition": concept.get("definition", ""),
+                "exam_probability": concept.get("exam_probability", 0),
+                "importance": concept.get("importance_score", 0),
                 "context": rag_text
             })
         
         # Sort by exam probability
         concept_contexts.sort(key=lambda x: x.get("exam_probability", 0), reverse=True)
         
-        # Build prompt
-        concepts_text = ""
+        # Build prompt; list-append + join instead of repeated +=
+        parts = []
+        append = parts.append
         for i, c in enumerate(concept_contexts[:15], 1):
-            concepts_text += f"\n### Concept {i}: {c['name']}\n"
-            concepts_text += f"Exam Probability: {c['exam_probability']:.0f}%\n"
-            concepts_text += f"Importance: {c['importance']}/10\n"
-            concepts_text += f"Definition: {c['definition']}\n"
+            append(f"\n### Concept {i}: {c['name']}\n")
+            append(f"Exam Probability: {c['exam_probability']:.0f}%\n")
+            append(f"Importance: {c['importance']}/10\n")
+            append(f"Definition: {c['definition']}\n")
             if c.get("context"):
-                concepts_text += f"Source Material:\n{c['context']}\n"
-        
+                append(f"Source Material:\n{c['context']}\n")
+        concepts_text = "".join(parts)
+
         solution_instruction = """
 - Include detailed step-by-step solutions
 - Show formulas, derivations, or reasoning
 - Provide examples where applicable""" if include_solutions else "- Do NOT include solutions (solutions will be provided separately if requested)"
         
+        # Static instruction block first, dynamic data last: provider
+        # prompt caches key on the longest shared prefix
         prompt = f"""You are an expert professor creating exam questions.
 
-Based on the following high-probability exam topics, predict {num_predictions} questions that are MOST LIKELY to appear on an exam.
+You will be given a list of high-probability exam topics. Predict questions that are MOST LIKELY to appear on an exam.
 
-{concepts_text}
-
-EXAM QUESTION REQUIREMENTS:
-- Questions should be exam-realistic and test deep understanding
-- Focus on HIGH exam probability concepts (listed above with percentages)
-- Mix question types: conceptual, application, problem-solving
-- Questions should be challenging but fair
-- Reference specific formulas, algorithms, or examples from the source material
-{solution_instruction}
-
-QUALITY STANDARDS:
-- Questions should be clear and unambiguous
-- Each question should test a specific learning objective
-- Difficulty should match exam standards
-- Questions should require understanding, not just memorization
+{_PREDICTION_STANDARDS.format(solution_instruction=solution_instruction)}
 
 Return ONLY a valid JSON array:
 [
@@ -166,16 +187,16 @@ Return ONLY a valid JSON array:
   }}
 ]
 
+TOPICS:
+{concepts_text}
+
 Generate exactly {num_predictions} high-probability exam questions. Return ONLY the JSON array:"""
 
         try:
-            response = await self.llm.generate(prompt, temperature=0.6)
-            
-            # Extract JSON
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            if json_match:
-                import json
-                predictions = json.loads(json_match.group())
+            response = await cached_generate(self.llm, prompt, temperature=0.6, json_kind="array")
+
+            predictions = parse_json_response(response, "array")
+            if predictions is not None:
                 return predictions[:num_predictions]
         except Exception as e:
             logger.error(f"Exam prediction generation failed: {e}")
@@ -199,43 +220,39 @@ Generate exactly {num_predictions} high-probability exam questions. Return ONLY
         Returns:
             Detailed solution text
         """
-        # Get RAG context if course_id provided
+        # Get RAG context if course_id provided; the query embedding is
+        # memoized, so a question that was just used for retrieval in
+        # _generate_predictions does not hit the model again
         context = ""
         if course_id:
             try:
                 from core.vector_store import get_vector_store
                 vector_store = get_vector_store()
-                chunks = vector_store.search(
-                    course_id=course_id,
-                    query=f"{concept_name} {question}",
-                    top_k=3
+                chunks = await asyncio.to_thread(
+                    vector_store.search,
+                    course_id,
+                    f"{concept_name} {question}",
+                    3
                 )
                 if chunks:
                     context = "\n\n".join([c.get("text", "") for c in chunks])
             except Exception as e:
                 logger.warning(f"Failed to get RAG context for solution: {e}")
-        
-        # Build context section (avoid backslash in f-string for Python 3.11 compatibility)
-        context_section = f"Relevant course material:\n{context}" if context else ""
-        
-        prompt = f"""You are an expert professor providing detailed exam solutions.
 
-Question: {question}
-Concept: {concept_name}
+        # Static instructions first, dynamic question/context last so the
+        # shared prefix stays cacheable across calls
+        prompt = f"""You are an expert professor providing detailed exam solutions.
 
-{context_section}
+{_SOLUTION_STEPS}
 
-Provide a DETAILED, STEP-BY-STEP solution that:
-1. Breaks down the problem clearly
-2. Shows all mathematical derivations or logical reasoning
-3. Explains WHY each step is taken
-4. Provides the final answer with context
-5. Includes key formulas or concepts used
+Question: {question}
+Concept: {concept_name}"""
 
-Make the solution educational and thorough, as if explaining to a student who wants to deeply understand the concept."""
+        if context:
+            prompt += f"\n\nRelevant course material:\n{context}"
 
         try:
-            solution = await self.llm.generate(prompt, temperature=0.4)
+            solution = await cached_generate(self.llm, prompt, temperature=0.4)
             return solution
         except Exception as e:
             logger.error(f"Solution generation failed: {e}")
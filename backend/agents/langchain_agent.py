@@ -7,15 +7,39 @@ LangChain-based agent framework for multi-agent workflows.
 from typing import Dict, List, Any, Optional
 from langchain.agents import AgentExecutor, create_structured_chat_agent
 from langchain.tools import Tool, StructuredTool
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationBufferWindowMemory
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain.schema import Document
 from pydantic import BaseModel, Field
+from functools import lru_cache
+import asyncio
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Intent patterns, compiled once; word boundaries avoid the substring
+# false-positives of `word in text` (e.g. "question" inside "questionnaire"
+# was fine, but "test" matched "greatest")
+_QUIZ_RE = re.compile(r"\b(quiz|test|question)\b", re.I)
+_EXPLAIN_RE = re.compile(r"\b(explain|what is|how does|define)\b", re.I)
+
+
+@lru_cache(maxsize=1)
+def _get_quiz_agent():
+    """Shared QuizGeneratorAgent; constructing one per request re-runs
+    BaseAgent init (LLM/RAG lookups, logging) on the hot chat path."""
+    from agents.quiz_generator import QuizGeneratorAgent
+    return QuizGeneratorAgent()
+
+
+@lru_cache(maxsize=1)
+def _get_explanation_agent():
+    """Shared ExplanationBuilderAgent singleton."""
+    from agents.explanation_builder import ExplanationBuilderAgent
+    return ExplanationBuilderAgent()
+
 
 class StudyBuddyToolInput(BaseModel):
     """Input schema for StudyBuddy tools."""
@@ -40,7 +64,10 @@ class LangChainStudyAgent:
         
         self.llm = llm or get_llm()
         self.rag = rag_system or get_rag_system()
-        self.memory = ConversationBufferMemory(
+        # Windowed memory keeps history (and per-turn prompt size) bounded
+        # instead of growing without limit over a long session
+        self.memory = ConversationBufferWindowMemory(
+            k=8,
             memory_key="chat_history",
             return_messages=True
         )
@@ -60,9 +87,7 @@ class LangChainStudyAgent:
         
         async def generate_quiz_question(concept: str) -> str:
             """Generate a quiz question for a concept."""
-            from agents.quiz_generator import QuizGeneratorAgent
-            agent = QuizGeneratorAgent()
-            questions = await agent.generate_questions(
+            questions = await _get_quiz_agent().generate_questions(
                 [{"name": concept, "definition": concept}],
                 num_questions=1
             )
@@ -70,12 +95,10 @@ class LangChainStudyAgent:
                 q = questions[0]
                 return f"Q: {q['question']}\nOptions: {q.get('options', [])}"
             return "Could not generate question."
-        
+
         async def explain_concept(concept: str) -> str:
             """Generate an explanation for a concept."""
-            from agents.explanation_builder import ExplanationBuilderAgent
-            agent = ExplanationBuilderAgent()
-            return await agent.generate_explanation(concept)
+            return await _get_explanation_agent().generate_explanation(concept)
         
         return [
             Tool(
@@ -98,6 +121,33 @@ class LangChainStudyAgent:
             )
         ]
     
+    async def batch_tool(self, calls: List[tuple]) -> List[str]:
+        """
+        Invoke several tools concurrently.
+
+        Args:
+            calls: List of (tool_name, argument) pairs
+
+        Returns:
+            One result string per call, in input order
+        """
+        coroutines = {t.name: t.coroutine for t in self.tools}
+
+        async def _invoke(name: str, arg: str) -> str:
+            coroutine = coroutines.get(name)
+            if coroutine is None:
+                return f"Unknown tool: {name}"
+            return await coroutine(arg)
+
+        results = await asyncio.gather(
+            *[_invoke(name, arg) for name, arg in calls],
+            return_exceptions=True
+        )
+        return [
+            f"Tool failed: {r}" if isinstance(r, Exception) else r
+            for r in results
+        ]
+
     async def run(self, user_input: str, course_id: str = None) -> str:
         """
         Run the LangChain agent with the given input.
@@ -118,11 +168,9 @@ class LangChainStudyAgent:
             # For now, use a simple chain since we're using Gemini
             # In production, this would use AgentExecutor with tools
             
-            # Determine intent
-            if any(word in user_input.lower() for word in ["quiz", "test", "question"]):
-                from agents.quiz_generator import QuizGeneratorAgent
-                agent = QuizGeneratorAgent()
-                questions = await agent.generate_questions(
+            # Determine intent (single regex pass, no per-keyword scans)
+            if _QUIZ_RE.search(user_input):
+                questions = await _get_quiz_agent().generate_questions(
                     [{"name": user_input, "definition": ""}],
                     num_questions=1
                 )
@@ -130,11 +178,9 @@ class LangChainStudyAgent:
                     q = questions[0]
                     return f"Here's a quiz question:\n\n**{q['question']}**\n\nOptions:\n" + \
                            "\n".join(f"  {chr(65+i)}. {opt}" for i, opt in enumerate(q.get('options', [])))
-            
-            elif any(word in user_input.lower() for word in ["explain", "what is", "how does", "define"]):
-                from agents.explanation_builder import ExplanationBuilderAgent
-                agent = ExplanationBuilderAgent()
-                return await agent.generate_explanation(user_input)
+
+            elif _EXPLAIN_RE.search(user_input):
+                return await _get_explanation_agent().generate_explanation(user_input)
             
             else:
                 # Default: RAG query
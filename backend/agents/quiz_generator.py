@@ -5,16 +5,171 @@ Generates personalized quiz questions using RAG.
 """
 
 from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+import asyncio
+import hashlib
 import logging
-import json
-import re
 import random
+import time
 
 from agents.base_agent import BaseAgent
+from core.json_utils import parse_json_response
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class Question:
+    """A generated quiz question; slots halve per-question memory vs a dict."""
+    question_text: str = ""
+    question_type: str = "mcq"
+    difficulty: str = "medium"
+    options: List[str] = field(default_factory=list)
+    correct_answer: str = ""
+    explanation: str = ""
+    concept_id: Optional[str] = None
+    concept_name: str = ""
+
+# Local RNG instance; the module-level random functions share one
+# lock-protected global state
+_RNG = random.Random()
+
+# Concept-context budget for the MCQ prompt, estimated at ~4 chars per
+# token (no local tokenizer ships with the Gemini SDK). Packing to a
+# budget keeps RAG-heavy prompts from overflowing while letting light
+# ones carry more than a fixed concept count would
+_CONCEPT_TOKEN_BUDGET = 6000
+_CHARS_PER_TOKEN = 4
+
+# TTL'd LRU of generated quizzes; retries and reshuffles re-issue the
+# same parameters, and the course version in the key busts entries when
+# new material is ingested
+_QUIZ_CACHE_TTL = 3600
+_QUIZ_CACHE_MAX = 1024
+_quiz_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+
+def _quiz_cache_get(key: bytes) -> Optional[List[Dict[str, Any]]]:
+    entry = _quiz_cache.get(key)
+    if entry is None:
+        return None
+    ts, questions = entry
+    if time.monotonic() - ts > _QUIZ_CACHE_TTL:
+        del _quiz_cache[key]
+        return None
+    _quiz_cache.move_to_end(key)
+    return [dict(q) for q in questions]
+
+
+def _quiz_cache_put(key: bytes, questions: List[Dict[str, Any]]) -> None:
+    _quiz_cache[key] = (time.monotonic(), [dict(q) for q in questions])
+    _quiz_cache.move_to_end(key)
+    while len(_quiz_cache) > _QUIZ_CACHE_MAX:
+        _quiz_cache.popitem(last=False)
+
+# Static fallback material, built once instead of per call; tuples so
+# nothing downstream can mutate the shared pools
+_TEMPLATES = {
+    "mcq": (
+        "What is {concept}?",
+        "Which of the following best describes {concept}?",
+        "What is the primary function of {concept}?",
+        "Which statement about {concept} is correct?",
+    ),
+    "true_false": (
+        "{concept} is used for {definition}.",
+        "{concept} is a type of {category}.",
+        "{concept} requires {related} as a prerequisite.",
+    ),
+    "short_answer": (
+        "Explain {concept} in your own words.",
+        "What are the key characteristics of {concept}?",
+        "Give an example of {concept} in practice.",
+        "How does {concept} relate to {related}?",
+    ),
+    "problem_solving": (
+        "Given a scenario involving {concept}, how would you apply it?",
+        "Design a solution using {concept}.",
+        "Analyze the following situation using {concept}.",
+    )
+}
+
+# Distractor pool as (prefix, takes_name) pairs: entries that mention
+# the concept are built with one concat instead of template formatting
+_DISTRACTOR_POOL = (
+    ("A method unrelated to ", True),
+    ("The opposite of ", True),
+    ("A common misconception about ", True),
+    ("An outdated definition of ", True),
+    ("A related but different concept", False),
+)
+
+# Frozen MCQ prompt scaffolding; only concepts_text, num_questions and
+# difficulty vary per call, keeping the static prefix byte-identical
+# for provider-side prompt caching
+_MCQ_PROMPT_TEMPLATE = """You are an expert professor creating a multiple-choice quiz for university students.
+
+Based on the following course content extracted from uploaded PDFs, generate {num_questions} HIGH-QUALITY multiple choice questions.
+
+{concepts_text}
+
+═══════════════════════════════════════════════════════════════════════════════
+STRICT REQUIREMENTS FOR MCQ QUESTIONS:
+═══════════════════════════════════════════════════════════════════════════════
+
+1. QUESTION QUALITY:
+   - Each question MUST test understanding of SPECIFIC content from the PDFs above
+   - Questions must be CLEAR, UNAMBIGUOUS, and have ONE definitively correct answer
+   - Test APPLICATION and COMPREHENSION, not just memorization
+   - Reference specific concepts, formulas, processes, or examples from the content
+
+2. OPTIONS (A, B, C, D):
+   - Provide EXACTLY 4 options for each question
+   - One option must be clearly correct
+   - Three distractors must be PLAUSIBLE but incorrect
+   - Distractors should be related concepts, common misconceptions, or partial truths
+   - Options should be similar in length and format
+   - AVOID obviously wrong answers like "None of the above" or joke answers
+
+3. DIFFICULTY LEVEL: {difficulty_upper}
+   - Easy: Direct recall from the source material
+   - Medium: Requires understanding and connecting concepts
+   - Hard: Requires analysis, application, or comparing multiple concepts
+
+4. FORBIDDEN QUESTION PATTERNS:
+   ✗ "What is [term]?" - too generic
+   ✗ "Define [concept]" - tests memorization only
+   ✗ Questions about things NOT in the source material
+   ✗ Vague or ambiguous questions
+   ✗ Questions with multiple correct answers
+
+5. EXCELLENT QUESTION EXAMPLES:
+   ✓ "Which of the following correctly describes the relationship between X and Y according to the course material?"
+   ✓ "In the context of [specific topic], what happens when [specific condition]?"
+   ✓ "Based on the lecture content, which statement about [concept] is TRUE?"
+   ✓ "What is the PRIMARY advantage of using [method A] over [method B] for [specific task]?"
+
+═══════════════════════════════════════════════════════════════════════════════
+OUTPUT FORMAT - Return ONLY this JSON array, nothing else:
+═══════════════════════════════════════════════════════════════════════════════
+
+[
+  {{
+    "question_text": "Your clear, specific question here?",
+    "question_type": "mcq",
+    "difficulty": "{difficulty}",
+    "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
+    "correct_answer": "The exact text of the correct option",
+    "explanation": "Detailed explanation of why this answer is correct, referencing the source material",
+    "concept_name": "Main concept being tested"
+  }}
+]
+
+Generate exactly {num_questions} questions. Each must be unique and test different aspects of the material.
+RETURN ONLY THE JSON ARRAY:"""
+
+
 class QuizGeneratorAgent(BaseAgent):
     """
     Agent for generating personalized quiz questions.
@@ -90,36 +245,56 @@ class QuizGeneratorAgent(BaseAgent):
             question_types = ["mcq"]  # Force MCQ only for quality quiz experience
         
         questions = []
-        
+
         # Get vector store for RAG context
         from core.vector_store import get_vector_store
         vector_store = get_vector_store()
-        
-        # Build rich context for each concept using RAG
-        enriched_concepts = []
-        for concept in concepts[:num_questions * 2]:
-            concept_name = concept.get("name", "")
-            concept_def = concept.get("definition", "")
-            
-            # Retrieve relevant content from vector store - get more context for better questions
-            rag_context = ""
-            if course_id and concept_name:
+
+        # Retries and reshuffles re-issue identical parameters; serve
+        # those from the response cache instead of paying the LLM again
+        cache_key = self._quiz_cache_key(
+            course_id, concepts, difficulty, num_questions, question_types,
+            vector_store.get_version(course_id) if course_id else 0
+        )
+        cached = _quiz_cache_get(cache_key)
+        if cached is not None:
+            self._log_action("Questions served from cache", {"count": len(cached)})
+            return cached
+        
+        # Build rich context for each concept with one batched RAG call:
+        # all queries embed together and probe the index in a single pass
+        selected = concepts[:num_questions * 2]
+        if not course_id:
+            # No-op enrichment: skip the per-concept dict copies entirely
+            enriched_concepts = selected
+        else:
+            contexts = [""] * len(selected)
+            queries = []
+            positions = []
+            for i, concept in enumerate(selected):
+                if concept.get("name"):
+                    queries.append(
+                        f"{concept.get('name', '')} {concept.get('definition', '')}"
+                    )
+                    positions.append(i)
+
+            if queries:
                 try:
-                    chunks = vector_store.search(
-                        course_id=course_id,
-                        query=f"{concept_name} {concept_def}",
-                        top_k=5  # Increased from 2 to get more context
+                    batch_results = await asyncio.to_thread(
+                        vector_store.batch_search, course_id, queries, 5
                     )
-                    if chunks:
-                        # Get more text per chunk for richer context
-                        rag_context = "\n\n".join([c.get("text", "")[:800] for c in chunks])
                 except Exception as e:
-                    logger.warning(f"RAG retrieval failed for concept {concept_name}: {e}")
-            
-            enriched_concepts.append({
-                **concept,
-                "rag_context": rag_context
-            })
+                    logger.warning(f"Batched RAG retrieval failed: {e}")
+                    batch_results = [[] for _ in queries]
+
+                for pos, chunks in zip(positions, batch_results):
+                    if chunks:
+                        contexts[pos] = self._dedupe_chunk_texts(chunks)
+
+            enriched_concepts = [
+                {**concept, "rag_context": rag_context} if rag_context else concept
+                for concept, rag_context in zip(selected, contexts)
+            ]
         
         # Try LLM generation with enriched context
         try:
@@ -131,15 +306,19 @@ class QuizGeneratorAgent(BaseAgent):
             )
             
             if llm_questions:
-                # Add concept IDs to questions
+                # Add concept IDs via one name->id map instead of a
+                # nested scan; setdefault keeps the first duplicate
+                name_to_id: Dict[str, Any] = {}
+                for c in concepts:
+                    if c.get("name"):
+                        name_to_id.setdefault(c["name"].lower(), c.get("id"))
+
                 for q in llm_questions:
-                    concept_name = q.get("concept_name", "").lower()
-                    for c in concepts:
-                        if c.get("name", "").lower() == concept_name:
-                            q["concept_id"] = c.get("id")
-                            break
-                
-                questions = llm_questions
+                    q.concept_id = name_to_id.get(q.concept_name.lower())
+
+                # Dicts cross the agent boundary (API serialization,
+                # response cache); Question keeps the hot path compact
+                questions = [asdict(q) for q in llm_questions]
         except Exception as e:
             logger.warning(f"LLM question generation failed: {e}")
         
@@ -158,119 +337,137 @@ class QuizGeneratorAgent(BaseAgent):
                 logger.warning(f"Fallback question generation also failed: {e}")
         
         self._log_action("Questions generated", {"count": len(questions)})
-        
-        return questions[:num_questions]
+
+        questions = questions[:num_questions]
+        if questions:
+            _quiz_cache_put(cache_key, questions)
+
+        return questions
+
+    @staticmethod
+    def _quiz_cache_key(
+        course_id: Optional[str],
+        concepts: List[Dict[str, Any]],
+        difficulty: str,
+        num_questions: int,
+        question_types: List[str],
+        course_version: int
+    ) -> bytes:
+        """Content-addressed key for one quiz request."""
+        concept_ids = ",".join(
+            sorted(str(c.get("id") or c.get("name", "")) for c in concepts)
+        )
+        raw = (
+            f"{course_id}|{concept_ids}|{difficulty}|{num_questions}|"
+            f"{','.join(question_types)}|{course_version}"
+        )
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
     
+    @staticmethod
+    def _dedupe_chunk_texts(chunks: List[Dict[str, Any]]) -> str:
+        """
+        Join chunk texts for a prompt, dropping duplicates.
+
+        Top-5 hits for semantically close queries often overlap; chunks
+        are skipped when their chunk_id repeats or their leading 64
+        chars hash to one already kept, so redundant text never reaches
+        the prompt.
+
+        Args:
+            chunks: Search hits with text and chunk_id
+
+        Returns:
+            Deduplicated chunk texts joined with blank lines
+        """
+        seen_ids = set()
+        seen_prefixes = set()
+        texts = []
+
+        for c in chunks:
+            chunk_id = c.get("chunk_id")
+            text = c.get("text", "")
+            prefix_hash = hash(text[:64])
+            if chunk_id in seen_ids or prefix_hash in seen_prefixes:
+                continue
+            seen_ids.add(chunk_id)
+            seen_prefixes.add(prefix_hash)
+            # Get more text per chunk for richer context
+            texts.append(text[:800])
+
+        return "\n\n".join(texts)
+
     async def _generate_with_rag_context(
         self,
         enriched_concepts: List[Dict[str, Any]],
         num_questions: int,
         difficulty: str,
         question_types: List[str]
-    ) -> List[Dict[str, Any]]:
+    ) -> List[Question]:
         """Generate MCQ questions using RAG-enriched concept context."""
         
-        # Build detailed concept context with more source material
-        concepts_text = ""
-        for i, c in enumerate(enriched_concepts[:20]):
-            concepts_text += f"\n\n### Topic {i+1}: {c.get('name', 'Unknown')}\n"
+        # Build detailed concept context with more source material,
+        # packing greedily into the context budget instead of cutting at
+        # a fixed concept count
+        budget = _CONCEPT_TOKEN_BUDGET * _CHARS_PER_TOKEN
+        parts = []
+        for i, c in enumerate(enriched_concepts):
+            block = [f"\n\n### Topic {i+1}: {c.get('name', 'Unknown')}\n"]
             if c.get('definition'):
-                concepts_text += f"Definition: {c.get('definition')}\n"
+                block.append(f"Definition: {c.get('definition')}\n")
             if c.get('rag_context'):
-                concepts_text += f"Detailed Content from PDF:\n{c.get('rag_context')}\n"
-        
-        prompt = f"""You are an expert professor creating a multiple-choice quiz for university students.
-
-Based on the following course content extracted from uploaded PDFs, generate {num_questions} HIGH-QUALITY multiple choice questions.
-
-{concepts_text}
-
-═══════════════════════════════════════════════════════════════════════════════
-STRICT REQUIREMENTS FOR MCQ QUESTIONS:
-═══════════════════════════════════════════════════════════════════════════════
-
-1. QUESTION QUALITY:
-   - Each question MUST test understanding of SPECIFIC content from the PDFs above
-   - Questions must be CLEAR, UNAMBIGUOUS, and have ONE definitively correct answer
-   - Test APPLICATION and COMPREHENSION, not just memorization
-   - Reference specific concepts, formulas, processes, or examples from the content
+                block.append(f"Detailed Content from PDF:\n{c.get('rag_context')}\n")
 
-2. OPTIONS (A, B, C, D):
-   - Provide EXACTLY 4 options for each question
-   - One option must be clearly correct
-   - Three distractors must be PLAUSIBLE but incorrect
-   - Distractors should be related concepts, common misconceptions, or partial truths
-   - Options should be similar in length and format
-   - AVOID obviously wrong answers like "None of the above" or joke answers
-
-3. DIFFICULTY LEVEL: {difficulty.upper()}
-   - Easy: Direct recall from the source material
-   - Medium: Requires understanding and connecting concepts
-   - Hard: Requires analysis, application, or comparing multiple concepts
-
-4. FORBIDDEN QUESTION PATTERNS:
-   ✗ "What is [term]?" - too generic
-   ✗ "Define [concept]" - tests memorization only
-   ✗ Questions about things NOT in the source material
-   ✗ Vague or ambiguous questions
-   ✗ Questions with multiple correct answers
-
-5. EXCELLENT QUESTION EXAMPLES:
-   ✓ "Which of the following correctly describes the relationship between X and Y according to the course material?"
-   ✓ "In the context of [specific topic], what happens when [specific condition]?"
-   ✓ "Based on the lecture content, which statement about [concept] is TRUE?"
-   ✓ "What is the PRIMARY advantage of using [method A] over [method B] for [specific task]?"
-
-═══════════════════════════════════════════════════════════════════════════════
-OUTPUT FORMAT - Return ONLY this JSON array, nothing else:
-═══════════════════════════════════════════════════════════════════════════════
-
-[
-  {{
-    "question_text": "Your clear, specific question here?",
-    "question_type": "mcq",
-    "difficulty": "{difficulty}",
-    "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
-    "correct_answer": "The exact text of the correct option",
-    "explanation": "Detailed explanation of why this answer is correct, referencing the source material",
-    "concept_name": "Main concept being tested"
-  }}
-]
+            block_text = "".join(block)
+            if len(block_text) > budget:
+                break
+            parts.append(block_text)
+            budget -= len(block_text)
+        concepts_text = "".join(parts)
+        
+        prompt = _MCQ_PROMPT_TEMPLATE.format(
+            concepts_text=concepts_text,
+            num_questions=num_questions,
+            difficulty=difficulty,
+            difficulty_upper=difficulty.upper()
+        )
 
-Generate exactly {num_questions} questions. Each must be unique and test different aspects of the material.
-RETURN ONLY THE JSON ARRAY:"""
+        # Stream the generation and stop as soon as the JSON array closes,
+        # so trailing prose is never generated or transferred
+        response = await self.llm.generate_json_text(
+            prompt, kind="array", temperature=0.6
+        )
 
-        response = await self.llm.generate(prompt, temperature=0.6)
-        
         try:
-            import re
-            # Try to extract JSON array
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            if json_match:
-                import json
-                questions = json.loads(json_match.group())
-                
-                # Validate and fix questions
+            questions = parse_json_response(response, "array")
+            if questions is not None:
+                # Validate questions in one pass: set membership for the
+                # answer check, one merged dict per question, no in-place
+                # mutation of the parsed entries
                 validated_questions = []
                 for q in questions[:num_questions]:
-                    # Ensure it's MCQ type
-                    q['question_type'] = 'mcq'
-                    
-                    # Ensure exactly 4 options
-                    if q.get('options') and len(q['options']) >= 4:
-                        q['options'] = q['options'][:4]
-                        
-                        # Ensure correct_answer matches one of the options
-                        if q.get('correct_answer') not in q['options']:
-                            # Try to find the closest match
-                            q['correct_answer'] = q['options'][0]
-                        
-                        validated_questions.append(q)
-                
+                    options = (q.get('options') or [])[:4]
+                    if len(options) < 4:
+                        continue
+
+                    option_set = frozenset(options)
+                    correct = q.get('correct_answer')
+                    if correct not in option_set:
+                        correct = options[0]
+
+                    validated_questions.append(Question(
+                        question_text=q.get('question_text', ''),
+                        question_type='mcq',
+                        difficulty=q.get('difficulty', difficulty),
+                        options=options,
+                        correct_answer=correct,
+                        explanation=q.get('explanation', ''),
+                        concept_name=q.get('concept_name', '')
+                    ))
+
                 return validated_questions
         except Exception as e:
             logger.warning(f"Failed to parse RAG questions JSON: {e}")
-        
+
         return []
     
     def _generate_template_questions(
@@ -297,42 +494,21 @@ RETURN ONLY THE JSON ARRAY:"""
     
     def _get_question_templates(self) -> Dict[str, List[str]]:
         """Get question templates by type."""
-        return {
-            "mcq": [
-                "What is {concept}?",
-                "Which of the following best describes {concept}?",
-                "What is the primary function of {concept}?",
-                "Which statement about {concept} is correct?",
-            ],
-            "true_false": [
-                "{concept} is used for {definition}.",
-                "{concept} is a type of {category}.",
-                "{concept} requires {related} as a prerequisite.",
-            ],
-            "short_answer": [
-                "Explain {concept} in your own words.",
-                "What are the key characteristics of {concept}?",
-                "Give an example of {concept} in practice.",
-                "How does {concept} relate to {related}?",
-            ],
-            "problem_solving": [
-                "Given a scenario involving {concept}, how would you apply it?",
-                "Design a solution using {concept}.",
-                "Analyze the following situation using {concept}.",
-            ]
-        }
-    
+        return _TEMPLATES
+
     def _generate_mcq(
         self,
         concept: Dict[str, Any],
         templates: Dict[str, List[str]],
-        difficulty: str
+        difficulty: str,
+        rng: random.Random = None
     ) -> Dict[str, Any]:
         """Generate a multiple choice question."""
+        rng = rng or _RNG
         name = concept.get("name", "Unknown")
         definition = concept.get("definition", "A key concept")
-        
-        template = random.choice(templates["mcq"])
+
+        template = rng.choice(_TEMPLATES["mcq"])
         question_text = template.format(
             concept=name,
             definition=definition,
@@ -344,7 +520,7 @@ RETURN ONLY THE JSON ARRAY:"""
         distractors = self._generate_distractors(name, correct, 3)
         
         options = [correct] + distractors
-        random.shuffle(options)
+        rng.shuffle(options)
         
         return {
             "question_text": question_text,
@@ -361,14 +537,16 @@ RETURN ONLY THE JSON ARRAY:"""
         self,
         concept: Dict[str, Any],
         templates: Dict[str, List[str]],
-        difficulty: str
+        difficulty: str,
+        rng: random.Random = None
     ) -> Dict[str, Any]:
         """Generate a true/false question."""
+        rng = rng or _RNG
         name = concept.get("name", "Unknown")
         definition = concept.get("definition", "A key concept")
-        
+
         # Randomly make it true or false
-        is_true = random.choice([True, False])
+        is_true = rng.random() < 0.5
         
         if is_true:
             statement = f"{name} {definition[:50]}..." if len(definition) > 50 else f"{name} is {definition}."
@@ -391,13 +569,15 @@ RETURN ONLY THE JSON ARRAY:"""
         self,
         concept: Dict[str, Any],
         templates: Dict[str, List[str]],
-        difficulty: str
+        difficulty: str,
+        rng: random.Random = None
     ) -> Dict[str, Any]:
         """Generate a short answer question."""
+        rng = rng or _RNG
         name = concept.get("name", "Unknown")
         definition = concept.get("definition", "A key concept")
-        
-        template = random.choice(templates["short_answer"])
+
+        template = rng.choice(_TEMPLATES["short_answer"])
         related = concept.get("related_concepts", "related concepts")
         
         question_text = template.format(
@@ -432,15 +612,13 @@ RETURN ONLY THE JSON ARRAY:"""
         Returns:
             List of distractor strings
         """
-        distractors = [
-            f"A method unrelated to {concept_name}",
-            f"The opposite of {concept_name}",
-            f"A common misconception about {concept_name}",
-            f"An outdated definition of {concept_name}",
-            f"A related but different concept",
+        picked = _RNG.sample(
+            _DISTRACTOR_POOL, min(num_distractors, len(_DISTRACTOR_POOL))
+        )
+        return [
+            prefix + concept_name if takes_name else prefix
+            for prefix, takes_name in picked
         ]
-        
-        return random.sample(distractors, min(num_distractors, len(distractors)))
     
     async def generate_adaptive_question(
         self,
@@ -482,18 +660,22 @@ RETURN ONLY THE JSON ARRAY:"""
         
         return questions[0] if questions else None
 
+    # Type -> generator dispatch table; unknown types fall back to
+    # short answer, matching the old if/elif chain
+    _FALLBACK_GENERATORS = {
+        "mcq": _generate_mcq,
+        "true_false": _generate_true_false,
+        "short_answer": _generate_short_answer,
+    }
+
     def generate_fallback_question(
         self,
         concept: Dict[str, Any],
         question_type: str = "mcq"
     ) -> Dict[str, Any]:
         """Generate a fallback question without LLM."""
-        templates = self._get_question_templates()
-        
-        if question_type == "mcq":
-            return self._generate_mcq(concept, templates, "medium")
-        elif question_type == "true_false":
-            return self._generate_true_false(concept, templates, "medium")
-        else:
-            return self._generate_short_answer(concept, templates, "medium")
+        generator = self._FALLBACK_GENERATORS.get(
+            question_type, QuizGeneratorAgent._generate_short_answer
+        )
+        return generator(self, concept, _TEMPLATES, "medium")
 
@@ -11,10 +11,13 @@ from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from collections import OrderedDict
+import asyncio
 import logging
 import hashlib
 import secrets
 import hmac
+import time
 
 from core.config import settings
 from core.database import get_db
@@ -22,15 +25,112 @@ from api.models.user import User
 
 logger = logging.getLogger(__name__)
 
-# JWT Bearer security scheme
+# JWT Bearer security schemes — module singletons shared by every
+# request; auto_error=False makes the optional variant yield None
+# instead of raising when no credentials are supplied
 security = HTTPBearer()
+_optional_security = HTTPBearer(auto_error=False)
+
+# Decoded-token LRU: clients present the same bearer token on every
+# request, so repeating signature verification is wasted work. Keys are
+# fixed-size blake2b digests (bounds memory regardless of token length)
+# and entries stay valid only until the token's own exp claim passes.
+_TOKEN_CACHE_MAX = 4096
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+
+class _UserLoader:
+    """
+    Coalesces concurrent user lookups into one IN query.
+
+    Bursts of parallel authenticated requests (an SPA firing several
+    XHRs at once) each need their user row; ids arriving within the
+    batching window are fetched with a single
+    SELECT ... WHERE id IN (...) instead of one round-trip per request.
+
+    The batched query runs on one of the waiting requests' sessions,
+    so dependency overrides (tests pointing get_db at another database)
+    are honoured. That session can be torn down mid-window if its
+    request is cancelled (client disconnect), so a failed batch falls
+    back to per-waiter queries on each waiter's own session rather than
+    failing every coalesced request.
+    """
+
+    BATCH_WINDOW = 0.001  # seconds to wait for more ids before flushing
+
+    def __init__(self):
+        self._pending: dict = {}
+        self._scheduled = False
+
+    async def load(self, user_id: str, db: AsyncSession) -> Optional[User]:
+        """Resolve one user id, sharing the query with concurrent calls."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(user_id, []).append((future, db))
+
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_later(
+                self.BATCH_WINDOW,
+                lambda: asyncio.ensure_future(self._flush())
+            )
+
+        return await future
+
+    async def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        if not pending:
+            return
+
+        session = next(iter(pending.values()))[0][1]
+        try:
+            result = await session.execute(
+                select(User).where(User.id.in_(pending.keys()))
+            )
+            users = {u.id: u for u in result.scalars()}
+        except Exception as e:
+            # The borrowed session may belong to a request that was
+            # cancelled during the batching window; don't take the
+            # other waiters down with it
+            logger.warning(f"Batched user lookup failed, retrying individually: {e}")
+            await self._load_individually(pending)
+            return
+
+        for user_id, waiters in pending.items():
+            user = users.get(user_id)
+            for future, _ in waiters:
+                if not future.done():
+                    future.set_result(user)
+
+    @staticmethod
+    async def _load_individually(pending: dict) -> None:
+        """Resolve each waiter on its own session after a failed batch."""
+        for user_id, waiters in pending.items():
+            for future, db in waiters:
+                if future.done():
+                    continue
+                try:
+                    result = await db.execute(
+                        select(User).where(User.id == user_id)
+                    )
+                    future.set_result(result.scalar_one_or_none())
+                except Exception as e:
+                    future.set_exception(e)
+
+
+_user_loader = _UserLoader()
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using SHA256 with a random salt."""
     salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256((salt + password).encode('utf-8')).hexdigest()
-    return f"{salt}${password_hash}"
+    # Feed salt and password through update() separately; same digest as
+    # hashing the concatenation, without the intermediate string
+    h = hashlib.sha256()
+    h.update(salt.encode('utf-8'))
+    h.update(password.encode('utf-8'))
+    return f"{salt}${h.hexdigest()}"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -40,10 +140,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             # Old bcrypt format - try direct comparison fallback
             logger.warning("Old password format detected, attempting fallback")
             return False
-        
+
         salt, stored_hash = hashed_password.split('$', 1)
-        password_hash = hashlib.sha256((salt + plain_password).encode('utf-8')).hexdigest()
-        return hmac.compare_digest(password_hash, stored_hash)
+        h = hashlib.sha256()
+        h.update(salt.encode('utf-8'))
+        h.update(plain_password.encode('utf-8'))
+        # Compare raw 32-byte digests instead of 64-char hex strings
+        return hmac.compare_digest(h.digest(), bytes.fromhex(stored_hash))
     except Exception as e:
         logger.error(f"Password verification error: {e}")
         return False
@@ -71,17 +174,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and validate a JWT token."""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    entry = _token_cache.get(key)
+    if entry is not None:
+        exp, payload = entry
+        if exp > time.time():
+            _token_cache.move_to_end(key)
+            return payload
+        del _token_cache[key]
+
     try:
         payload = jwt.decode(
             token,
             settings.secret_key,
             algorithms=[settings.jwt_algorithm]
         )
-        return payload
     except JWTError as e:
         logger.warning(f"JWT decode error: {e}")
         return None
 
+    # Only cache tokens that carry an exp claim; it doubles as the
+    # cache entry's own expiry
+    exp = payload.get("exp")
+    if exp:
+        _token_cache[key] = (exp, payload)
+        while len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+
+    return payload
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -104,12 +225,16 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    # Get user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
+    # Get user from database; concurrent requests share one batched query
+    user = await _user_loader.load(user_id, db)
+
     if user is None:
         raise credentials_exception
+
+    # Attach the batch-loaded row to this request's session so route
+    # code can mutate and refresh it as before; load=False skips a
+    # second round-trip since the instance is freshly loaded and clean
+    user = await db.merge(user, load=False)
     
     if not user.is_active:
         raise HTTPException(
@@ -129,7 +254,7 @@ async def get_current_active_user(
 
 # Optional authentication (returns None if not authenticated)
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_optional_security),
     db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """Get user if authenticated, None otherwise."""
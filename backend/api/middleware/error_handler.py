@@ -5,11 +5,10 @@ Global exception handling and custom exceptions.
 """
 
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
-import traceback
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -108,6 +107,9 @@ class RateLimitError(StudyBuddyException):
 # Exception Handlers
 # ============================================
 
+# Handlers respond with ORJSONResponse: the envelope (including the raw
+# datetime timestamp) is serialized by orjson in C instead of stdlib json
+
 async def studybuddy_exception_handler(request: Request, exc: StudyBuddyException):
     """Handle custom StudyBuddy exceptions."""
     logger.error(f"StudyBuddyException: {exc.message}", extra={
@@ -116,13 +118,13 @@ async def studybuddy_exception_handler(request: Request, exc: StudyBuddyExceptio
         "path": request.url.path
     })
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": True,
             "message": exc.message,
             "details": exc.details,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
@@ -134,55 +136,56 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         "path": request.url.path
     })
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": True,
             "message": str(exc.detail),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation exceptions."""
-    errors = []
-    for error in exc.errors():
-        errors.append({
-            "field": ".".join(str(loc) for loc in error["loc"]),
+    errors = [
+        {
+            "field": ".".join(map(str, error["loc"])),
             "message": error["msg"],
             "type": error["type"]
-        })
-    
+        }
+        for error in exc.errors()
+    ]
+
     logger.warning(f"ValidationError: {errors}", extra={"path": request.url.path})
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "error": True,
             "message": "Validation error",
             "details": errors,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
 
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle all unhandled exceptions."""
+    # exc_info defers traceback rendering to the formatter, so the
+    # multi-KB string is only built when a handler actually emits it
     logger.error(
-        f"Unhandled exception: {str(exc)}",
-        extra={
-            "path": request.url.path,
-            "traceback": traceback.format_exc()
-        }
+        f"Unhandled exception: {exc}",
+        extra={"path": request.url.path},
+        exc_info=exc
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": True,
             "message": "An internal error occurred. Please try again later.",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
     )
 
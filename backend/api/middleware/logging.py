@@ -7,21 +7,30 @@ Structured logging configuration and request logging.
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 import logging
+import os
 import time
-import uuid
 from datetime import datetime
 import json
 import sys
 
+try:
+    import orjson
+    _ORJSON_OPTS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+except ImportError:  # pragma: no cover - orjson is a pinned dependency
+    orjson = None
+    _ORJSON_OPTS = 0
+
 from core.config import settings
 
 
 class JSONFormatter(logging.Formatter):
     """JSON log formatter for structured logging."""
-    
+
     def format(self, record: logging.LogRecord) -> str:
+        # The datetime is passed through as-is: orjson renders it in C,
+        # skipping the Python-side isoformat() string build
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcnow(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -47,7 +56,11 @@ class JSONFormatter(logging.Formatter):
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
-        
+
+        if orjson is not None:
+            return orjson.dumps(log_data, option=_ORJSON_OPTS).decode()
+
+        log_data["timestamp"] = log_data["timestamp"].isoformat()
         return json.dumps(log_data)
 
 
@@ -62,16 +75,28 @@ class StandardFormatter(logging.Formatter):
         "CRITICAL": "\033[35m",  # Magenta
     }
     RESET = "\033[0m"
-    
+
+    # Per-level (color, padded-level+reset) fragments, built once so
+    # format() never re-pads or re-colors the level name
+    _LEVEL_FRAGMENT = {}
+    for _level, _color in COLORS.items():
+        _LEVEL_FRAGMENT[_level] = (_color, f"{_level:8}{RESET}")
+    del _level, _color
+
     def format(self, record: logging.LogRecord) -> str:
-        color = self.COLORS.get(record.levelname, self.RESET)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        message = f"{color}[{timestamp}] {record.levelname:8}{self.RESET} | {record.name} | {record.getMessage()}"
-        
+        color, level_fragment = self._LEVEL_FRAGMENT.get(
+            record.levelname,
+            (self.RESET, f"{record.levelname:8}{self.RESET}")
+        )
+        # time.strftime uses the C strftime directly, skipping the
+        # datetime object datetime.now().strftime would build
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        message = f"{color}[{timestamp}] {level_fragment} | {record.name} | {record.getMessage()}"
+
         if record.exc_info:
             message += f"\n{self.formatException(record.exc_info)}"
-        
+
         return message
 
 
@@ -106,11 +131,13 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Middleware for logging all HTTP requests."""
     
     async def dispatch(self, request: Request, call_next) -> Response:
-        # Generate request ID
-        request_id = str(uuid.uuid4())[:8]
+        # Generate request ID; os.urandom goes straight from the OS RNG
+        # to 8 hex chars without building and slicing a UUID string
+        request_id = os.urandom(4).hex()
         
-        # Start timer
-        start_time = time.time()
+        # Start timer; perf_counter_ns is monotonic (immune to clock
+        # steps) and keeps the duration math in integers
+        start_time = time.perf_counter_ns()
         
         # Add request ID to request state
         request.state.request_id = request_id
@@ -134,7 +161,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
             
             # Calculate duration
-            duration_ms = round((time.time() - start_time) * 1000, 2)
+            duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
             
             # Log response
             logger.info(
@@ -154,7 +181,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             return response
             
         except Exception as e:
-            duration_ms = round((time.time() - start_time) * 1000, 2)
+            duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
             logger.error(
                 f"✗ {request.method} {request.url.path} - Error ({duration_ms}ms): {str(e)}",
                 extra={
@@ -82,6 +82,16 @@ class Settings(BaseSettings):
     # Whisper
     whisper_model: str = "base"
     whisper_device: str = "cpu"
+
+    # Caching
+    enable_confusion_cache: bool = True
+
+    # Extraction cache (re-ingesting an identical file skips parsing)
+    extraction_cache_dir: str = "./extraction_cache"
+    extraction_cache_max_entries: int = 256
+
+    # LLM concurrency cap for batched agent calls
+    llm_max_concurrency: int = 5
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -102,6 +112,7 @@ class Settings(BaseSettings):
         """Create required directories if they don't exist."""
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.faiss_index_dir, exist_ok=True)
+        os.makedirs(self.extraction_cache_dir, exist_ok=True)
         os.makedirs("logs", exist_ok=True)
 
 
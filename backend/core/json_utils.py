@@ -0,0 +1,180 @@
+"""
+StudyBuddy AI - JSON Extraction Utilities
+==========================================
+Helpers for pulling JSON out of LLM responses.
+"""
+
+from typing import Any, AsyncIterator, Optional, Tuple
+import json
+import logging
+import re
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is a pinned dependency
+    orjson = None
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+_OPENERS = {"object": "{", "array": "["}
+_CLOSERS = {"{": "}", "[": "]"}
+
+# Lenient-recovery patterns: markdown fences around the payload and
+# trailing commas before a closer are the two most common LLM slips
+_FENCE_RE = re.compile(r"```(?:json)?")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def extract_json(text: str, kind: str = "object") -> Optional[str]:
+    """
+    Return the first balanced JSON object/array embedded in text.
+
+    Walks the text once, tracking bracket depth outside quoted strings,
+    so nested structures and trailing prose are handled without the
+    backtracking of a greedy regex like r'\\{[\\s\\S]*\\}'.
+
+    Args:
+        text: Raw LLM output
+        kind: "object" for {...}, "array" for [...]
+
+    Returns:
+        The balanced JSON slice, or None if none is found
+    """
+    opener = _OPENERS[kind]
+    closer = _CLOSERS[opener]
+
+    start = text.find(opener)
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escape = False
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if escape:
+            escape = False
+        elif ch == "\\":
+            escape = in_string
+        elif ch == '"':
+            in_string = not in_string
+        elif not in_string:
+            if ch == opener:
+                depth += 1
+            elif ch == closer:
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+
+    return None
+
+
+async def collect_json_from_stream(
+    chunks: AsyncIterator[str],
+    kind: str = "object"
+) -> Tuple[Optional[str], str]:
+    """
+    Consume a streamed LLM response only until its JSON payload closes.
+
+    Runs the same depth/in-string scanner as extract_json incrementally
+    over arriving chunks and stops consuming (closing the stream) as
+    soon as the first top-level structure is balanced — trailing prose
+    is never generated or transferred.
+
+    Args:
+        chunks: Async iterator of response text pieces
+        kind: "object" or "array"
+
+    Returns:
+        (balanced JSON slice or None, all text consumed so far)
+    """
+    opener = _OPENERS[kind]
+    closer = _CLOSERS[opener]
+
+    buf: list = []
+    consumed = 0          # chars scanned so far
+    start = -1            # absolute offset of the payload opener
+    depth = 0
+    in_string = False
+    escape = False
+
+    try:
+        async for piece in chunks:
+            buf.append(piece)
+
+            for i, ch in enumerate(piece):
+                if start == -1:
+                    if ch == opener:
+                        start = consumed + i
+                        depth = 1
+                    continue
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = in_string
+                elif ch == '"':
+                    in_string = not in_string
+                elif not in_string:
+                    if ch == opener:
+                        depth += 1
+                    elif ch == closer:
+                        depth -= 1
+                        if depth == 0:
+                            text = "".join(buf)
+                            end = consumed + i + 1
+                            return text[start:end], text
+
+            consumed += len(piece)
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    return None, "".join(buf)
+
+
+def parse_json_response(text: str, kind: str = "object") -> Optional[Any]:
+    """
+    Parse the JSON payload of an LLM response.
+
+    Tries a direct parse of the whole response first — the common case
+    of clean model output — and only falls back to scanning for the
+    first balanced structure when that fails. Decoding goes through
+    orjson when available.
+
+    Args:
+        text: Raw LLM output
+        kind: "object" or "array"
+
+    Returns:
+        The parsed object/array, or None when no valid JSON is present
+    """
+    expected = dict if kind == "object" else list
+
+    try:
+        value = _loads(text)
+        if isinstance(value, expected):
+            return value
+    except ValueError:
+        pass
+
+    sliced = extract_json(_FENCE_RE.sub("", text), kind)
+    if sliced is not None:
+        try:
+            value = _loads(sliced)
+            if isinstance(value, expected):
+                return value
+        except ValueError:
+            # Lenient pass: drop trailing commas before retrying, which
+            # salvages an otherwise-lost completion without a regeneration
+            try:
+                value = _loads(_TRAILING_COMMA_RE.sub(r"\1", sliced))
+                if isinstance(value, expected):
+                    return value
+            except ValueError as e:
+                logger.warning(f"Failed to parse extracted JSON: {e}")
+
+    return None
@@ -10,9 +10,11 @@ import logging
 import asyncio
 from functools import lru_cache
 import json
+import random
 import re
 
 from core.config import settings
+from core.json_utils import collect_json_from_stream
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +67,27 @@ class GeminiLLM:
             logger.error(f"Failed to initialize Gemini model: {e}")
             self.model = None
     
+    async def warmup(self) -> None:
+        """
+        Pre-establish the connection to the Gemini API.
+
+        Issues a cheap model-metadata call at startup so the first real
+        generation doesn't pay TCP+TLS setup on its critical path. The
+        SDK keeps the underlying channel alive, and every agent shares
+        this client through the get_llm() singleton. Safe no-op when no
+        API key is configured.
+        """
+        if not self.model:
+            return
+
+        try:
+            await asyncio.to_thread(
+                genai.get_model, f"models/{settings.gemini_model}"
+            )
+            logger.info("Gemini connection warmed up")
+        except Exception as e:
+            logger.warning(f"Gemini warmup failed: {e}")
+
     async def generate(
         self,
         prompt: str,
@@ -118,7 +141,9 @@ class GeminiLLM:
             except Exception as e:
                 error_msg = str(e)
                 if "429" in error_msg and attempt < max_retries:
-                    wait_time = base_delay * (2 ** attempt)
+                    # Jitter de-synchronizes concurrent callers so they
+                    # don't all retry in the same instant
+                    wait_time = base_delay * (2 ** attempt) + random.uniform(0, 1)
                     logger.warning(f"Gemini Rate Limit (429). Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
                     await asyncio.sleep(wait_time)
                     continue
@@ -130,6 +155,77 @@ class GeminiLLM:
         # Fallback if all retries exhausted without explicit return
         return self._fallback_response(prompt)
     
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_instruction: str = None,
+        temperature: float = 0.7
+    ):
+        """
+        Generate text as an async stream of text pieces.
+
+        Args:
+            prompt: The user prompt
+            system_instruction: Optional system instruction
+            temperature: Creativity level (0-1)
+
+        Yields:
+            Response text incrementally as the model produces it
+        """
+        if not self.model:
+            yield self._fallback_response(prompt)
+            return
+
+        full_prompt = ""
+        if system_instruction:
+            full_prompt = f"{system_instruction}\n\n"
+        full_prompt += prompt
+
+        response = await self.model.generate_content_async(
+            full_prompt, stream=True
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def generate_json_text(
+        self,
+        prompt: str,
+        kind: str = "object",
+        temperature: float = 0.7
+    ) -> str:
+        """
+        Generate a response whose payload is JSON, ending early.
+
+        Streams the generation and stops consuming as soon as the first
+        top-level object/array closes, so trailing prose after the JSON
+        is never generated or billed. Falls back to a full non-streaming
+        generate() (with its retry handling) if streaming fails.
+
+        Args:
+            prompt: The user prompt
+            kind: "object" or "array"
+            temperature: Creativity level (0-1)
+
+        Returns:
+            The balanced JSON slice, or the full response text when no
+            balanced payload appeared
+        """
+        if not self.model:
+            return self._fallback_response(prompt)
+
+        try:
+            stream = self.generate_stream(prompt, temperature=temperature)
+            sliced, consumed = await collect_json_from_stream(stream, kind)
+            if sliced is not None:
+                return sliced
+            if consumed:
+                return consumed
+        except Exception as e:
+            logger.warning(f"Streaming generation failed, falling back: {e}")
+
+        return await self.generate(prompt, temperature=temperature)
+
     async def extract_concepts(
         self,
         text: str,
@@ -209,15 +305,19 @@ Return ONLY the JSON array:"""
         if not question_types:
             question_types = ["mcq", "true_false", "short_answer"]
         
-        concepts_text = "\n".join([
-            f"- {c['name']}: {c.get('definition', 'No definition')}"
-            for c in concepts[:20]
-        ])
-        
-        prompt = f"""Generate {num_questions} quiz questions based on these concepts:
+        # Numbered concepts let one batched prompt cover every concept;
+        # the model maps question i back to concept [i]
+        concepts_text = "\n".join(
+            f"[{i}] {c['name']}: {c.get('definition', 'No definition')}"
+            for i, c in enumerate(concepts[:20], 1)
+        )
+
+        prompt = f"""Generate {num_questions} quiz questions based on these numbered concepts:
 
 {concepts_text}
 
+Cover the numbered concepts in order: question 1 tests concept [1], question 2 tests concept [2], and so on, cycling back to [1] if there are more questions than concepts.
+
 Requirements:
 - Difficulty: {difficulty}
 - Question types: {', '.join(question_types)}
@@ -0,0 +1,284 @@
+"""
+StudyBuddy AI - Semantic LLM Cache
+===================================
+Embedding-based response cache for expensive LLM calls.
+"""
+
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+import copy
+import hashlib
+import logging
+import pickle
+import time
+
+import numpy as np
+
+from core.embeddings import get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+# On-disk cache location (best effort; cache works in-memory if unwritable)
+CACHE_DIR = Path.home() / ".studybuddy" / "cache"
+
+
+class SemanticCache:
+    """
+    Semantic cache for LLM responses.
+
+    Prompts are embedded with the local sentence-transformer model and
+    matched against previous prompts by cosine similarity. On a hit the
+    cached response is returned and the LLM call is skipped entirely —
+    embedding cost is orders of magnitude below generation cost.
+
+    Entries expire after a TTL and the oldest entries are evicted once
+    the cache is full.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        similarity_threshold: float = 0.95,
+        max_entries: int = 512,
+        ttl_seconds: int = 24 * 3600
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Cache name (used for the persistence file)
+            similarity_threshold: Minimum cosine similarity for a hit
+            max_entries: Maximum cached entries before eviction
+            ttl_seconds: Entry lifetime in seconds
+        """
+        self.name = name
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.embedder = get_embedding_service()
+
+        # Parallel structures: row i of _embeddings belongs to _entries[i]
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    async def get(self, prompt: str) -> Optional[Any]:
+        """
+        Look up a cached response for a prompt.
+
+        Args:
+            prompt: The prompt text
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        if self.embedder.model is None or not self._entries:
+            return None
+
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        try:
+            query = await self.embedder.embed_async(prompt)
+            query = query[0] if query.ndim > 1 else query
+
+            # Embeddings are normalized, so dot product == cosine similarity
+            similarities = np.dot(self._embeddings, query)
+            best = int(np.argmax(similarities))
+
+            if similarities[best] >= self.similarity_threshold:
+                self.hits += 1
+                # Deep copy so callers that mutate the result (e.g. the
+                # concept extractor stamping chunk ids and relationships
+                # onto concept dicts) can't corrupt the cached entry
+                return copy.deepcopy(self._entries[best]["response"])
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+
+        self.misses += 1
+        return None
+
+    async def put(self, prompt: str, response: Any) -> None:
+        """
+        Store a response for a prompt.
+
+        Args:
+            prompt: The prompt text
+            response: The LLM response to cache
+        """
+        if self.embedder.model is None:
+            return
+
+        try:
+            embedding = await self.embedder.embed_async(prompt)
+            embedding = embedding if embedding.ndim > 1 else embedding[None, :]
+
+            if self._embeddings is None:
+                self._embeddings = embedding
+            else:
+                self._embeddings = np.vstack([self._embeddings, embedding])
+
+            # Deep copy: the caller often keeps mutating the object it
+            # just cached (enrichment passes run after put)
+            self._entries.append({
+                "timestamp": time.time(),
+                "response": copy.deepcopy(response)
+            })
+
+            # Evict oldest entries once full
+            if len(self._entries) > self.max_entries:
+                excess = len(self._entries) - self.max_entries
+                self._entries = self._entries[excess:]
+                self._embeddings = self._embeddings[excess:]
+
+            self._save()
+        except Exception as e:
+            logger.warning(f"Semantic cache store failed: {e}")
+
+    def _evict_expired(self) -> None:
+        """Drop entries older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        keep = [i for i, e in enumerate(self._entries) if e["timestamp"] >= cutoff]
+
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._embeddings = self._embeddings[keep] if keep else None
+
+    def _cache_file(self) -> Path:
+        return CACHE_DIR / f"{self.name}.pkl"
+
+    def _load(self) -> None:
+        """Load persisted entries from disk (best effort)."""
+        try:
+            path = self._cache_file()
+            if path.exists():
+                with open(path, "rb") as f:
+                    data = pickle.load(f)
+                self._embeddings = data["embeddings"]
+                self._entries = data["entries"]
+                self._evict_expired()
+                logger.info(f"Semantic cache '{self.name}' loaded: {len(self._entries)} entries")
+        except Exception as e:
+            logger.warning(f"Failed to load semantic cache '{self.name}': {e}")
+            self._embeddings = None
+            self._entries = []
+
+    def _save(self) -> None:
+        """Persist entries to disk (best effort)."""
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self._cache_file(), "wb") as f:
+                pickle.dump({
+                    "embeddings": self._embeddings,
+                    "entries": self._entries
+                }, f)
+        except Exception as e:
+            logger.debug(f"Failed to persist semantic cache '{self.name}': {e}")
+
+
+# Singleton instances, one per cache name
+@lru_cache(maxsize=None)
+def get_semantic_cache(name: str = "default", **kwargs) -> SemanticCache:
+    """Get a named semantic cache singleton."""
+    return SemanticCache(name=name)
+
+
+# ---------------------------------------------------------------------------
+# Exact prompt cache
+# ---------------------------------------------------------------------------
+
+# In-process tier for content-addressed generations; entries spill to a
+# one-file-per-entry disk tier under CACHE_DIR so they survive restarts
+_PROMPT_CACHE_MAX = 1024
+_prompt_cache: "OrderedDict[str, str]" = OrderedDict()
+
+# Above this temperature output variety is the point, so caching a
+# single response would defeat the call site's intent
+_CACHEABLE_MAX_TEMPERATURE = 0.6
+
+
+def _prompt_key(prompt: str, temperature: float) -> str:
+    """Content-addressed key for a (prompt, temperature) pair."""
+    digest = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+    return f"{digest}:{temperature}"
+
+
+def _prompt_file(key: str) -> Path:
+    return CACHE_DIR / f"prompt_{key.replace(':', '_')}.txt"
+
+
+async def cached_generate(
+    llm,
+    prompt: str,
+    temperature: float = 0.7,
+    json_kind: Optional[str] = None,
+    **kwargs
+) -> str:
+    """
+    Generate text through a content-addressed response cache.
+
+    Prompts in this codebase are deterministic functions of their inputs
+    (concept lists, course text), so re-opening a course or retrying a
+    parse failure re-issues byte-identical prompts. A hit skips the LLM
+    round trip entirely. High-temperature calls bypass the cache since
+    their callers want variety.
+
+    Args:
+        llm: The GeminiLLM instance to generate with on a miss
+        prompt: The prompt text
+        temperature: Generation temperature
+        json_kind: When "object"/"array", misses stream the generation
+            and stop as soon as the JSON payload closes
+        **kwargs: Extra arguments passed through to llm.generate
+
+    Returns:
+        The (possibly cached) generated text
+    """
+    async def _generate() -> str:
+        if json_kind is not None:
+            return await llm.generate_json_text(
+                prompt, kind=json_kind, temperature=temperature
+            )
+        return await llm.generate(prompt, temperature=temperature, **kwargs)
+
+    if temperature > _CACHEABLE_MAX_TEMPERATURE:
+        return await _generate()
+
+    key = _prompt_key(prompt, temperature)
+
+    cached = _prompt_cache.get(key)
+    if cached is not None:
+        _prompt_cache.move_to_end(key)
+        return cached
+
+    # Disk tier (best effort)
+    try:
+        path = _prompt_file(key)
+        if path.exists():
+            response = path.read_text()
+            _prompt_cache[key] = response
+            return response
+    except Exception as e:
+        logger.debug(f"Prompt cache read failed: {e}")
+
+    response = await _generate()
+
+    _prompt_cache[key] = response
+    while len(_prompt_cache) > _PROMPT_CACHE_MAX:
+        _prompt_cache.popitem(last=False)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _prompt_file(key).write_text(response)
+    except Exception as e:
+        logger.debug(f"Prompt cache write failed: {e}")
+
+    return response
@@ -0,0 +1,45 @@
+"""
+StudyBuddy AI - Ranking Utilities
+==================================
+Top-K selection helpers for concept ranking.
+"""
+
+from typing import Any, Callable, List, Sequence
+
+import numpy as np
+
+
+def top_k(
+    items: Sequence[Any],
+    score_fn: Callable[[Any], float],
+    k: int
+) -> List[Any]:
+    """
+    Select the k highest-scoring items, ordered by descending score.
+
+    Scores go into a float32 array once; np.argpartition picks the top
+    k in O(n) and only the k survivors are sorted, instead of paying an
+    O(n log n) full sort with Python-level comparisons just to slice
+    off the head.
+
+    Args:
+        items: Items to rank
+        score_fn: Scoring function, higher is better
+        k: Number of items to keep
+
+    Returns:
+        The top k items by score, best first
+    """
+    n = len(items)
+    if n == 0 or k <= 0:
+        return []
+
+    scores = np.fromiter((score_fn(it) for it in items), dtype=np.float32, count=n)
+
+    if k >= n:
+        idx = np.argsort(-scores, kind="stable")
+    else:
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+
+    return [items[i] for i in idx]
@@ -6,19 +6,43 @@ FAISS-based vector storage for RAG retrieval.
 
 import faiss
 import numpy as np
+import hashlib
 import os
 import json
 import logging
+import threading
+import time
 from typing import List, Dict, Optional, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import asyncio
 
+from functools import lru_cache
+from pathlib import Path
+
 from core.config import settings
 from core.embeddings import get_embedding_service
 
 logger = logging.getLogger(__name__)
 
+# Disk tier for search results; in-memory caches die on worker restart,
+# so hot RAG lookups survive deploys here (best effort)
+_RAG_DISK_DIR = Path.home() / ".studybuddy" / "cache" / "rag"
+_RAG_DISK_MAX = 512
+_RAG_DISK_TTL = 86400
+
+
+@lru_cache(maxsize=512)
+def _cached_query_embedding(query: str) -> np.ndarray:
+    """Embed a query string, memoized — repeat queries skip the model."""
+    embedding = get_embedding_service().embed(query)
+    if len(embedding.shape) == 1:
+        embedding = embedding.reshape(1, -1)
+    embedding.setflags(write=False)
+    return embedding
+
 
 @dataclass
 class ChunkMetadata:
@@ -39,6 +63,114 @@ class ChunkMetadata:
             self.created_at = datetime.utcnow().isoformat()
 
 
+class ProximityCache:
+    """
+    Approximate result cache keyed on query embeddings.
+
+    Near-duplicate queries ("Photosynthesis definition" across sessions)
+    produce almost identical embeddings, so results are reused when a
+    new query's cosine similarity to a cached one clears a threshold.
+    Lookup is a single matmul against the cached embedding matrix.
+
+    Key vectors are stored int8-quantized with a per-vector scale — a
+    quarter of the float32 footprint, and the distance scan streams
+    less memory.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 2048):
+        """
+        Initialize the cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit
+            max_entries: Total cached entries before FIFO eviction
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self._total = 0
+        # course_id -> parallel lists of (normalized vec, top_k, results)
+        self._buckets: Dict[str, Dict[str, list]] = {}
+        # Callers run on arbitrary worker threads (asyncio.to_thread,
+        # the multi-course fan-out), so bucket mutation must be serial
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        vec = vec.reshape(-1).astype(np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    @classmethod
+    def _quantize(cls, vec: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Normalize then quantize a vector to (int8 values, scale)."""
+        vec = cls._normalize(vec)
+        scale = float(np.max(np.abs(vec)) / 127.0) or 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+
+    def get(
+        self,
+        course_id: str,
+        query_embedding: np.ndarray,
+        top_k: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return results for the nearest cached query, or None."""
+        with self._lock:
+            bucket = self._buckets.get(course_id)
+            if not bucket:
+                return None
+
+            candidates = [i for i, k in enumerate(bucket["top_ks"]) if k == top_k]
+            if not candidates:
+                return None
+
+            query_q, query_scale = self._quantize(query_embedding)
+
+            # int32 dot of the int8 keys, rescaled back to cosine similarity
+            keys = np.vstack([bucket["vecs"][i] for i in candidates]).astype(np.int32)
+            scales = np.array(
+                [bucket["scales"][i] for i in candidates], dtype=np.float32
+            )
+            sims = (keys @ query_q.astype(np.int32)) * scales * query_scale
+            best = int(np.argmax(sims))
+
+            if sims[best] >= self.similarity_threshold:
+                return list(bucket["results"][candidates[best]])
+            return None
+
+    def put(
+        self,
+        course_id: str,
+        query_embedding: np.ndarray,
+        top_k: int,
+        results: List[Dict[str, Any]]
+    ) -> None:
+        """Cache results under the query's embedding."""
+        vec_q, scale = self._quantize(query_embedding)
+        with self._lock:
+            bucket = self._buckets.setdefault(
+                course_id, {"vecs": [], "scales": [], "top_ks": [], "results": []}
+            )
+            bucket["vecs"].append(vec_q)
+            bucket["scales"].append(scale)
+            bucket["top_ks"].append(top_k)
+            bucket["results"].append(results)
+            self._total += 1
+
+            if self._total > self.max_entries:
+                # Evict the oldest entry of the fullest bucket
+                fullest = max(self._buckets.values(), key=lambda b: len(b["vecs"]))
+                for field in ("vecs", "scales", "top_ks", "results"):
+                    fullest[field].pop(0)
+                self._total -= 1
+
+    def invalidate(self, course_id: str) -> None:
+        """Drop all entries for a course whose index changed."""
+        with self._lock:
+            bucket = self._buckets.pop(course_id, None)
+            if bucket:
+                self._total -= len(bucket["vecs"])
+
+
 class VectorStore:
     """
     FAISS-based vector store for semantic search.
@@ -50,24 +182,130 @@ class VectorStore:
     - Fast similarity search
     """
     
+    # Search-result cache bounds; concept queries repeat heavily within
+    # a study session, and results only change when chunks are added
+    SEARCH_CACHE_TTL = 600
+    SEARCH_CACHE_MAX = 4096
+
     def __init__(self, index_dir: str = None):
         """
         Initialize vector store.
-        
+
         Args:
             index_dir: Directory for storing indices
         """
         self.index_dir = index_dir or settings.faiss_index_dir
         os.makedirs(self.index_dir, exist_ok=True)
-        
+
         self.embedding_service = get_embedding_service()
         self.dimension = self.embedding_service.dimension
-        
+
         # Cache for loaded indices
         self._indices: Dict[str, faiss.Index] = {}
         self._metadata: Dict[str, List[ChunkMetadata]] = {}
-        
+
+        # TTL'd LRU of search results keyed by (course, query hash, k),
+        # backed by an approximate cache that also catches near-duplicate
+        # query phrasings
+        self._search_cache: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._proximity_cache = ProximityCache()
+
+        # search() runs on worker threads (asyncio.to_thread, the
+        # multi-course pool), so the OrderedDict/version bookkeeping and
+        # the disk-tier sweep each need serializing
+        self._search_cache_lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+        # Per-course change counter; callers fold it into their own
+        # cache keys so index changes bust stale entries automatically
+        self._course_versions: Dict[str, int] = {}
+
         logger.info(f"VectorStore initialized. Dimension: {self.dimension}")
+
+    @staticmethod
+    def _search_cache_key(course_id: str, query: str, top_k: int) -> Tuple:
+        return (course_id, hashlib.sha1(query.encode()).hexdigest(), top_k)
+
+    def _search_cache_get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Look up cached results, expiring stale entries."""
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is None:
+                return None
+            ts, results = entry
+            if time.monotonic() - ts > self.SEARCH_CACHE_TTL:
+                del self._search_cache[key]
+                return None
+            self._search_cache.move_to_end(key)
+            return list(results)
+
+    def _search_cache_put(self, key: Tuple, results: List[Dict[str, Any]]) -> None:
+        with self._search_cache_lock:
+            self._search_cache[key] = (time.monotonic(), results)
+            self._search_cache.move_to_end(key)
+            while len(self._search_cache) > self.SEARCH_CACHE_MAX:
+                self._search_cache.popitem(last=False)
+
+    @staticmethod
+    def _rag_disk_file(key: Tuple) -> Path:
+        course_id, digest, top_k = key
+        return _RAG_DISK_DIR / f"{course_id}_{digest}_{top_k}.json"
+
+    def _rag_disk_get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Read cached results from disk, expiring stale files."""
+        try:
+            with self._disk_lock:
+                path = self._rag_disk_file(key)
+                if not path.exists():
+                    return None
+                if time.time() - path.stat().st_mtime > _RAG_DISK_TTL:
+                    path.unlink()
+                    return None
+                results = json.loads(path.read_text())
+                os.utime(path)  # refresh for the LRU sweep
+                return results
+        except Exception as e:
+            logger.debug(f"RAG disk cache read failed: {e}")
+            return None
+
+    def _rag_disk_put(self, key: Tuple, results: List[Dict[str, Any]]) -> None:
+        """Persist results to disk (best effort)."""
+        try:
+            with self._disk_lock:
+                _RAG_DISK_DIR.mkdir(parents=True, exist_ok=True)
+                path = self._rag_disk_file(key)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(results))
+                os.replace(tmp, path)
+
+                entries = sorted(
+                    _RAG_DISK_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime
+                )
+                for stale in entries[:max(0, len(entries) - _RAG_DISK_MAX)]:
+                    stale.unlink(missing_ok=True)
+        except Exception as e:
+            logger.debug(f"RAG disk cache write failed: {e}")
+
+    def _invalidate_search_cache(self, course_id: str) -> None:
+        """Drop cached results for a course whose index changed."""
+        with self._search_cache_lock:
+            stale = [k for k in self._search_cache if k[0] == course_id]
+            for k in stale:
+                del self._search_cache[k]
+            self._course_versions[course_id] = (
+                self._course_versions.get(course_id, 0) + 1
+            )
+        self._proximity_cache.invalidate(course_id)
+        try:
+            with self._disk_lock:
+                for path in _RAG_DISK_DIR.glob(f"{course_id}_*.json"):
+                    path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.debug(f"RAG disk cache invalidation failed: {e}")
+
+    def get_version(self, course_id: str) -> int:
+        """Monotonic counter bumped whenever a course index changes."""
+        return self._course_versions.get(course_id, 0)
     
     def _get_index_path(self, course_id: str) -> Tuple[str, str]:
         """Get paths for index and metadata files."""
@@ -180,7 +418,8 @@ class VectorStore:
         
         # Save to disk
         self._save_index(course_id)
-        
+        self._invalidate_search_cache(course_id)
+
         logger.info(f"Added {len(chunks)} chunks to course {course_id}")
         return len(chunks)
     
@@ -197,34 +436,77 @@ class VectorStore:
         if course_id is None:
             return self._search_all(query, top_k)
 
+        cache_key = self._search_cache_key(course_id, query, top_k)
+        cached = self._search_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Disk tier: warm results survive worker restarts
+        persisted = self._rag_disk_get(cache_key)
+        if persisted is not None:
+            self._search_cache_put(cache_key, persisted)
+            return persisted
+
+        query_embedding = self.embed_query(query)
+
+        # Near-duplicate phrasings of cached queries hit here
+        approximate = self._proximity_cache.get(course_id, query_embedding, top_k)
+        if approximate is not None:
+            self._search_cache_put(cache_key, approximate)
+            return approximate
+
+        results = self.search_by_vector(course_id, query_embedding, top_k)
+        self._search_cache_put(cache_key, results)
+        self._proximity_cache.put(course_id, query_embedding, top_k, results)
+        self._rag_disk_put(cache_key, results)
+
+        logger.debug(f"Found {len(results)} results for query in course {course_id}")
+        return results
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Get the (memoized) embedding for a query string."""
+        return _cached_query_embedding(query)
+
+    def search_by_vector(
+        self,
+        course_id: str,
+        query_embedding: np.ndarray,
+        top_k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Search a course index with an already-computed query vector."""
         index = self._get_or_create_index(course_id)
-        
+
         if index.ntotal == 0:
             logger.warning(f"Empty index for course {course_id}")
             return []
-        
-        # Generate query embedding
-        query_embedding = self.embedding_service.embed(query)
+
         if len(query_embedding.shape) == 1:
             query_embedding = query_embedding.reshape(1, -1)
-        
-        # Search
+
         k = min(top_k, index.ntotal)
         distances, indices = index.search(query_embedding, k)
-        
-        # Build results with metadata
+
+        return self._format_hits(
+            distances[0], indices[0], self._metadata.get(course_id, [])
+        )
+
+    @staticmethod
+    def _format_hits(
+        distances,
+        indices,
+        metadata_list: List[ChunkMetadata]
+    ) -> List[Dict[str, Any]]:
+        """Build result dicts for one query's hit row."""
         results = []
-        metadata_list = self._metadata.get(course_id, [])
-        
-        for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
+        for dist, idx in zip(distances, indices):
             if idx < 0 or idx >= len(metadata_list):
                 continue
-            
+
             meta = metadata_list[idx]
-            
+
             # Convert L2 distance to similarity score (0-1)
             score = 1.0 / (1.0 + dist)
-            
+
             results.append({
                 "chunk_id": meta.chunk_id,
                 "text": meta.text,
@@ -234,26 +516,140 @@ class VectorStore:
                 "material_id": meta.material_id,
                 "importance_score": meta.importance_score
             })
-        
-        logger.debug(f"Found {len(results)} results for query in course {course_id}")
         return results
 
+    def batch_search(
+        self,
+        course_id: str,
+        queries: List[str],
+        top_k: int = 10
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search many queries against one course in a single pass.
+
+        All queries are embedded in one batch and FAISS probes the index
+        with the whole query matrix at once, collapsing N embed+search
+        round trips into one of each.
+
+        Args:
+            queries: Query strings
+            top_k: Results per query
+
+        Returns:
+            One result list per query, in input order
+        """
+        if not queries:
+            return []
+
+        # Serve repeats from the cache and only embed the misses;
+        # identical queries within one batch share a single lookup
+        results: List[Optional[List[Dict[str, Any]]]] = []
+        miss_positions = []
+        first_seen: Dict[str, int] = {}
+        duplicate_of: Dict[int, int] = {}
+        for i, query in enumerate(queries):
+            cached = self._search_cache_get(
+                self._search_cache_key(course_id, query, top_k)
+            )
+            results.append(cached)
+            if cached is None:
+                if query in first_seen:
+                    duplicate_of[i] = first_seen[query]
+                else:
+                    first_seen[query] = i
+                    miss_positions.append(i)
+
+        if not miss_positions:
+            for pos, src in duplicate_of.items():
+                results[pos] = list(results[src])
+            return results
+
+        index = self._get_or_create_index(course_id)
+
+        if index.ntotal == 0:
+            logger.warning(f"Empty index for course {course_id}")
+            return [r if r is not None else [] for r in results]
+
+        # One batched embedding call for every miss, then one matrix probe
+        embeddings = self.embedding_service.embed([queries[i] for i in miss_positions])
+        hit_rows = self.batch_search_by_vector(course_id, embeddings, top_k)
+
+        for pos, hits in zip(miss_positions, hit_rows):
+            results[pos] = hits
+            self._search_cache_put(
+                self._search_cache_key(course_id, queries[pos], top_k), hits
+            )
+
+        for pos, src in duplicate_of.items():
+            results[pos] = list(results[src])
+
+        return results
+
+    def batch_search_by_vector(
+        self,
+        course_id: str,
+        vectors: np.ndarray,
+        top_k: int = 10
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Probe one course index with precomputed query vectors.
+
+        Callers that already hold embeddings (batched upstream or
+        memoized) skip the embedding model entirely and pay one FAISS
+        matrix search for all vectors.
+
+        Args:
+            vectors: Query embedding matrix, one row per query
+            top_k: Results per query
+
+        Returns:
+            One result list per vector, in input order
+        """
+        if len(vectors.shape) == 1:
+            vectors = vectors.reshape(1, -1)
+
+        index = self._get_or_create_index(course_id)
+
+        if index.ntotal == 0:
+            logger.warning(f"Empty index for course {course_id}")
+            return [[] for _ in range(len(vectors))]
+
+        k = min(top_k, index.ntotal)
+        distances, indices = index.search(vectors, k)
+
+        metadata_list = self._metadata.get(course_id, [])
+        return [
+            self._format_hits(row_d, row_i, metadata_list)
+            for row_d, row_i in zip(distances, indices)
+        ]
+
     def _search_all(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Search across all available indices."""
-        # Find all index files
-        all_results = []
-        
         # Ensure indices are loaded
         if not os.path.exists(self.index_dir):
             return []
-            
-        for filename in os.listdir(self.index_dir):
-            if filename.endswith(".faiss"):
-                c_id = filename.replace(".faiss", "")
-                # Search this course
-                results = self.search(c_id, query, top_k=5) # increased recall
-                all_results.extend(results)
-        
+
+        course_ids = [
+            filename.replace(".faiss", "")
+            for filename in os.listdir(self.index_dir)
+            if filename.endswith(".faiss")
+        ]
+        if not course_ids:
+            return []
+
+        all_results = []
+        if len(course_ids) == 1:
+            all_results = self.search(course_ids[0], query, top_k=5)  # increased recall
+        else:
+            # Probe course indices in parallel; FAISS releases the GIL
+            # during search and the query embedding is memoized, so the
+            # per-course scans overlap instead of running serially
+            with ThreadPoolExecutor(max_workers=min(4, len(course_ids))) as pool:
+                for results in pool.map(
+                    lambda c_id: self.search(c_id, query, top_k=5), course_ids
+                ):
+                    all_results.extend(results)
+
         # Sort by score
         all_results.sort(key=lambda x: x["score"], reverse=True)
         return all_results[:top_k]
@@ -282,6 +678,7 @@ class VectorStore:
             del self._indices[course_id]
         if course_id in self._metadata:
             del self._metadata[course_id]
+        self._invalidate_search_cache(course_id)
         
         # Remove files
         index_path, metadata_path = self._get_index_path(course_id)
@@ -6,11 +6,16 @@ FastAPI application entry point.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 
+import asyncio
+
 from core.config import settings
 from core.database import engine, Base
+from core.llm import get_llm
+from agents.content_ingestion import ContentIngestionAgent
 from core.monitoring import MetricsMiddleware, get_metrics
 from api.middleware.logging import setup_logging, RequestLoggingMiddleware
 from api.middleware.error_handler import setup_exception_handlers
@@ -39,6 +44,13 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     
     logger.info("✅ Database tables created")
+
+    # Warm up the shared Gemini client and the content extractors off
+    # the critical path so the first request/upload doesn't pay
+    # connection setup or model/library cold starts
+    asyncio.create_task(get_llm().warmup())
+    asyncio.create_task(ContentIngestionAgent.warmup())
+
     logger.info(f"📚 StudyBuddy AI is ready! Environment: {settings.environment}")
     
     yield
@@ -54,7 +66,8 @@ app = FastAPI(
     version="1.0.1",
     lifespan=lifespan,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware